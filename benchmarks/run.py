@@ -0,0 +1,422 @@
+#!/bin/python3
+
+"""Benchmarks of the learners, scanners and generators of SigmaPie.
+Copyright (C) 2019  Alena Aksenova.
+
+Every benchmark runs on synthetic corpora parameterized by the size of
+the alphabet, the locality window k, the number of words and their
+length, and is timed with `timeit`. The results can be stored as a
+baseline and compared with it later to detect regressions:
+
+    python benchmarks/run.py --save      # stores benchmarks/baseline.json
+    python benchmarks/run.py             # compares with the baseline
+    python benchmarks/run.py --quick -k scan  # the smallest corpora, scanning only
+
+The comparison exits with the status 1 if some benchmark is slower than
+its baseline by more than the tolerance. Timings depend on the machine:
+store the baseline and compare on the same one.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import os
+import sys
+import json
+import timeit
+import argparse
+import platform
+from itertools import product
+from random import Random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "src"))
+
+from sigmapie.sl_class import SL
+from sigmapie.tsl_class import TSL
+from sigmapie.mtsl_class import MTSL
+from sigmapie.sp_class import SP
+from sigmapie.fsm_family import FSMFamily
+from sigmapie.ostia import ostia
+
+BASELINE = os.path.join(HERE, "baseline.json")
+
+# the values of the corpus parameters; the quick grid uses the first ones
+GRID = {
+    "alphabet": [4, 8],
+    "k": [2, 3],
+    "words": [200, 1000],
+    "length": [6, 12],
+}
+
+# OSTIA is quadratic in the size of the prefix tree, its corpora are smaller
+OSTIA_GRID = {"alphabet": [3, 4], "words": [50, 100], "length": [4, 6]}
+
+
+def make_alphabet(size):
+    """Returns the alphabet of the given size: the first letters of the
+    Latin alphabet."""
+    if not 3 <= size <= 26:
+        raise ValueError("The alphabet must contain from 3 to 26 symbols.")
+    return [chr(ord("a") + i) for i in range(size)]
+
+
+def make_corpus(alphabet, words, length, harmony=True, seed=0):
+    """Generates a corpus of random words.
+
+    Arguments:
+        alphabet (int): the number of symbols;
+        words (int): the number of words;
+        length (int): the average length of the words; the lengths are
+            uniformly distributed between length/2 and 3*length/2;
+        harmony (bool): the first two symbols of the alphabet never
+            occur in the same word, a long-distance pattern with the
+            tier of these two symbols;
+        seed (int): seed of the random generator.
+    Returns:
+        list: the generated words.
+    """
+    symbols = make_alphabet(alphabet)
+    rng = Random(seed)
+    corpus = []
+    for i in range(words):
+        size = rng.randint(max(1, length // 2), length + length // 2)
+        word = [rng.choice(symbols) for j in range(size)]
+        if harmony:
+            value = rng.choice(symbols[:2])
+            word = [value if s in symbols[:2] else s for s in word]
+        corpus.append("".join(word))
+    return corpus
+
+
+def make_pairs(alphabet, words, length, seed=0):
+    """Generates a corpus of input-output pairs of a local rewrite rule:
+    the first symbol of the alphabet becomes the third one after the
+    second one, as in "ba" -> "bc".
+
+    Arguments:
+        alphabet (int): the number of symbols;
+        words (int): the number of pairs;
+        length (int): the average length of the words, see `make_corpus`;
+        seed (int): seed of the random generator.
+    Returns:
+        list: pairs of the form (input, output).
+    """
+    a, b, c = make_alphabet(alphabet)[:3]
+    pairs = {}
+    for w in make_corpus(alphabet, words, length, harmony=False, seed=seed):
+        out = [w[0]] + [c if s == a and p == b else s for p, s in zip(w, w[1:])]
+        pairs[w] = "".join(out)
+    return list(pairs.items())
+
+
+BENCHMARKS = []
+
+
+def benchmark(grid):
+    """Registers a benchmark: a function of the corpus parameters that
+    prepares the data and returns the callable that is timed.
+
+    Arguments:
+        grid (dict): the values of the parameters of the benchmark.
+    """
+
+    def register(setup):
+        BENCHMARKS.append((setup.__name__[len("bench_") :], grid, setup))
+        return setup
+
+    return register
+
+
+def subgrid(*names, **fixed):
+    """Selects the parameters of the main grid and fixes some of them."""
+    grid = {name: GRID[name] for name in names}
+    grid.update({name: [value] for name, value in fixed.items()})
+    return grid
+
+
+def learned(cls, alphabet, words, length, **options):
+    """Learns a grammar of the given class from a harmony corpus."""
+    data = make_corpus(alphabet, words, length)
+    grammar = cls(alphabet=make_alphabet(alphabet), data=data, **options)
+    grammar.learn()
+    return grammar
+
+
+def scan_all(grammar, alphabet, words, length):
+    """Prepares the scanning of a corpus in which about a half of the
+    words violate the harmony pattern."""
+    test = make_corpus(alphabet, words, length, harmony=False, seed=1)
+    test += make_corpus(alphabet, words, length, seed=2)
+    grammar.compile()
+    return lambda: [grammar.scan(w) for w in test]
+
+
+@benchmark(subgrid("alphabet", "k", "words", "length"))
+def bench_sl_learn(alphabet, k, words, length):
+    data = make_corpus(alphabet, words, length)
+    symbols = make_alphabet(alphabet)
+    return lambda: SL(k=k, alphabet=symbols, data=data).learn()
+
+
+@benchmark(subgrid("alphabet", "k", "words", "length"))
+def bench_tsl_learn(alphabet, k, words, length):
+    data = make_corpus(alphabet, words, length)
+    symbols = make_alphabet(alphabet)
+    return lambda: TSL(k=k, alphabet=symbols, data=data).learn()
+
+
+@benchmark(subgrid("alphabet", "words", "length"))
+def bench_mtsl_learn(alphabet, words, length):
+    data = make_corpus(alphabet, words, length)
+    symbols = make_alphabet(alphabet)
+    return lambda: MTSL(alphabet=symbols, data=data).learn()
+
+
+@benchmark(subgrid("alphabet", "k", "words", "length", k=2))
+def bench_sp_learn(alphabet, k, words, length):
+    data = make_corpus(alphabet, words, length)
+    symbols = make_alphabet(alphabet)
+    return lambda: SP(k=k, alphabet=symbols, data=data).learn()
+
+
+@benchmark(subgrid("alphabet", "k", "words", "length"))
+def bench_sl_scan(alphabet, k, words, length):
+    sl = learned(SL, alphabet, words, length, k=k)
+    return scan_all(sl, alphabet, words, length)
+
+
+@benchmark(subgrid("alphabet", "k", "words", "length"))
+def bench_tsl_scan(alphabet, k, words, length):
+    tsl = learned(TSL, alphabet, words, length, k=k)
+    return scan_all(tsl, alphabet, words, length)
+
+
+@benchmark(subgrid("alphabet", "words", "length"))
+def bench_mtsl_scan(alphabet, words, length):
+    mtsl = learned(MTSL, alphabet, words, length)
+    return scan_all(mtsl, alphabet, words, length)
+
+
+@benchmark(subgrid("alphabet", "k", "words", "length", k=2))
+def bench_sp_scan(alphabet, k, words, length):
+    sp = learned(SP, alphabet, words, length, k=k)
+    return scan_all(sp, alphabet, words, length)
+
+
+@benchmark(subgrid("alphabet", "k", "words"))
+def bench_sl_generate_sample(alphabet, k, words):
+    sl = learned(SL, alphabet, 200, 6, k=k)
+    return lambda: sl.generate_sample(words, seed=0)
+
+
+@benchmark(subgrid("alphabet", "k", "words"))
+def bench_tsl_generate_sample(alphabet, k, words):
+    tsl = learned(TSL, alphabet, 200, 6, k=k)
+    return lambda: tsl.generate_sample(words, seed=0)
+
+
+@benchmark(subgrid("alphabet", "words"))
+def bench_mtsl_generate_sample(alphabet, words):
+    mtsl = learned(MTSL, alphabet, 200, 6)
+    return lambda: mtsl.generate_sample(words, seed=0)
+
+
+@benchmark(subgrid("alphabet", "words", k=2))
+def bench_sp_generate_sample(alphabet, k, words):
+    sp = learned(SP, alphabet, 200, 6, k=k)
+    return lambda: sp.generate_sample(words, repeat=True, seed=0)
+
+
+@benchmark({"alphabet": [12, 22], "max_len": [None, 8]})
+def bench_sp_generate_unique(alphabet, max_len):
+    # a negative grammar banning about a half of the pairs: its whole
+    # subsequence automaton is exponential in the size of the alphabet
+    symbols = make_alphabet(alphabet)
+    rng = Random(0)
+    banned = [pair for pair in product(symbols, repeat=2) if rng.random() < 0.5]
+    sp = SP(alphabet=symbols, grammar=banned, polar="n")
+    return lambda: sp.generate_sample(10, seed=0, max_len=max_len)
+
+
+@benchmark(subgrid("alphabet", "k"))
+def bench_sl_fsmize(alphabet, k):
+    sl = learned(SL, alphabet, 1000, 6, k=k)
+    return sl.fsmize
+
+
+@benchmark(subgrid("alphabet", "k"))
+def bench_tsl_fsmize(alphabet, k):
+    tsl = learned(TSL, alphabet, 1000, 6, k=k)
+    return tsl.fsmize
+
+
+@benchmark(subgrid("alphabet"))
+def bench_mtsl_fsmize(alphabet):
+    mtsl = learned(MTSL, alphabet, 1000, 6)
+
+    def run():
+        mtsl.clear_cache()
+        mtsl.fsmize()
+
+    return run
+
+
+@benchmark(subgrid("alphabet", "k"))
+def bench_sp_fsmize(alphabet, k):
+    sp = learned(SP, alphabet, 1000, 6, k=k)
+
+    def run():
+        sp.fsm = FSMFamily()
+        sp.fsmize()
+
+    return run
+
+
+@benchmark(subgrid("alphabet", "k"))
+def bench_sl_clean_grammar(alphabet, k):
+    sl = learned(SL, alphabet, 1000, 6, k=k)
+    grammar = sl.grammar
+
+    def run():
+        sl.grammar = list(grammar)
+        sl.clean_grammar()
+
+    return run
+
+
+@benchmark(subgrid("alphabet"))
+def bench_mtsl_clean_grammar(alphabet):
+    mtsl = learned(MTSL, alphabet, 1000, 6)
+    grammar = mtsl.grammar
+
+    def run():
+        mtsl.grammar = {tier: list(r) for tier, r in grammar.items()}
+        mtsl.clean_grammar()
+
+    return run
+
+
+@benchmark(OSTIA_GRID)
+def bench_ostia(alphabet, words, length):
+    pairs = make_pairs(alphabet, words, length)
+    symbols = make_alphabet(alphabet)
+    return lambda: ostia(pairs, symbols, symbols)
+
+
+@benchmark(OSTIA_GRID)
+def bench_fst_rewrite(alphabet, words, length):
+    pairs = make_pairs(alphabet, words, length)
+    symbols = make_alphabet(alphabet)
+    fst = ostia(pairs, symbols, symbols)
+    test = make_corpus(alphabet, 1000, length, harmony=False, seed=1)
+    return lambda: [fst.rewrite(w) for w in test]
+
+
+def cases(quick=False, pattern=None):
+    """Lists the benchmarks with all combinations of their parameters.
+
+    Arguments:
+        quick (bool): only uses the first value of every parameter;
+        pattern (str): only keeps the benchmarks whose names contain it.
+    Returns:
+        list: triples (name, setup, parameters).
+    """
+    result = []
+    for name, grid, setup in BENCHMARKS:
+        names = list(grid)
+        values = [grid[n][:1] if quick else grid[n] for n in names]
+        for combination in product(*values):
+            params = dict(zip(names, combination))
+            label = ",".join(n + "=" + str(v) for n, v in params.items())
+            full = name + "[" + label + "]"
+            if pattern is None or pattern in full:
+                result.append((full, setup, params))
+    return result
+
+
+def measure(run, repeat=5, min_time=0.2):
+    """Times a callable: it is called often enough for a single timing to
+    last at least `min_time` seconds, and the best of `repeat` timings
+    is taken.
+
+    Returns:
+        float: the time of a single call in seconds.
+    """
+    timer = timeit.Timer(run)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / number
+
+
+def format_time(seconds):
+    """Formats a duration with a suitable unit."""
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return "%.2f %s" % (seconds / scale, unit)
+    return "%.0f ns" % (seconds / 1e-9)
+
+
+def main(argv=None):
+    """Runs the benchmarks and stores or compares the results."""
+    parser = argparse.ArgumentParser(description="Benchmarks of SigmaPie.")
+    parser.add_argument("-k", dest="pattern", help="only run matching benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smallest corpora only")
+    parser.add_argument("--repeat", type=int, default=5, help="timings per case")
+    parser.add_argument("--save", action="store_true", help="store as the baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="path of the baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed relative slowdown before reporting a regression",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results, regressions = {}, []
+    for name, setup, params in cases(args.quick, args.pattern):
+        results[name] = measure(setup(**params), args.repeat)
+        line = "%-60s %10s" % (name, format_time(results[name]))
+        if name in baseline:
+            ratio = results[name] / baseline[name]
+            line += "  x%.2f" % ratio
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line, flush=True)
+
+    if args.save:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                stored = json.load(f)["results"]
+            results = dict(stored, **results)
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        print("The baseline is stored in " + args.baseline + ".")
+        return 0
+
+    if regressions:
+        print(str(len(regressions)) + " benchmarks are slower than the baseline.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
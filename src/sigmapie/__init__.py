@@ -6,25 +6,66 @@
    it under the terms of the GNU General Public License as published by
    the Free Software Foundation; either version 3 of the License, or
    (at your option) any later version.
+
+   The grammar classes are imported on first access, so that
+   `import sigmapie` stays cheap and silent. The OSTIA learner is
+   imported eagerly: it shares its name with its module, and a lazy
+   import would be shadowed by the module once `sigmapie.ostia` is
+   imported.
 """
 
-from sigmapie.sl_class import *
-from sigmapie.tsl_class  import *
-from sigmapie.mtsl_class import *
-from sigmapie.sp_class import *
-from sigmapie.ostia import *
-
-print(
-    "\nYou successfully loaded SigmaPie. \n\n"
-    "Formal language classes and grammars available:\n"
-    "\t* strictly piecewise: SP(alphabet, grammar, k, data, polar);\n"
-    "\t* strictly local: SL(alphabet, grammar, k, data, edges, polar);\n"
-    "\t* tier-based strictly local: TSL(alphabet, grammar, k, data, edges,"
-    " polar, tier);\n"
-    "\t* multiple tier-based strictly local: MTSL(alphabet, grammar, k, "
-    "data, edges, polar).\n\n"
-    "Alternatively, you can initialize a transducer: "
-    "FST(states, sigma, gamma, initial, transitions, stout).\n"
-    "Learning algorithm:\n"
-    "\tOSTIA: ostia(sample, sigma, gamma)."
-)
+import sys
+from importlib import import_module
+from sigmapie.ostia import ostia
+
+# public names and the modules that define them
+_lazy = {
+    "SL": "sigmapie.sl_class",
+    "TSL": "sigmapie.tsl_class",
+    "MTSL": "sigmapie.mtsl_class",
+    "SP": "sigmapie.sp_class",
+    "FST": "sigmapie.fst_object",
+    "profile": "sigmapie.profiling",
+    "Progress": "sigmapie.progress",
+    "Cancelled": "sigmapie.progress",
+}
+
+__all__ = list(_lazy) + ["ostia", "welcome"]
+
+
+def __getattr__(name):
+    """Imports the module defining the requested name on first access."""
+    if name not in _lazy:
+        raise AttributeError("module 'sigmapie' has no attribute " + repr(name))
+    value = getattr(import_module(_lazy[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the names of the package, including the ones not loaded yet."""
+    return sorted(set(globals()) | set(__all__))
+
+
+def welcome():
+    """Prints the overview of the available classes and learners."""
+    print(
+        "\nYou successfully loaded SigmaPie. \n\n"
+        "Formal language classes and grammars available:\n"
+        "\t* strictly piecewise: SP(alphabet, grammar, k, data, polar);\n"
+        "\t* strictly local: SL(alphabet, grammar, k, data, edges, polar);\n"
+        "\t* tier-based strictly local: TSL(alphabet, grammar, k, data, edges,"
+        " polar, tier);\n"
+        "\t* multiple tier-based strictly local: MTSL(alphabet, grammar, k, "
+        "data, edges, polar).\n\n"
+        "Alternatively, you can initialize a transducer: "
+        "FST(states, sigma, gamma, initial, transitions, stout).\n"
+        "Learning algorithm:\n"
+        "\tOSTIA: ostia(sample, sigma, gamma)."
+    )
+
+
+# module-level __getattr__ is only supported since Python 3.7
+if sys.version_info < (3, 7):
+    for _name in _lazy:
+        __getattr__(_name)
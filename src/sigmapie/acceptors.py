@@ -0,0 +1,649 @@
+"""Compiled acceptors for the grammars of the subregular package. Copyright
+(C) 2019  Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+from itertools import chain, product
+from sigmapie.symbols import *
+
+
+class Acceptor(object):
+    """A general class for compiled acceptors.
+
+    Subclasses define the initial state, reading a single symbol, and
+    whether a string can end in a given state; states are hashable.
+    Attributes:
+        edges (list): start- and end-symbols of the grammar.
+    """
+
+    def initial_state(self):
+        """Returns the state before reading the first symbol."""
+        raise NotImplementedError
+
+    def step(self, state, symbol):
+        """Returns the state after reading the symbol, or None if the
+        symbol cannot be read in the given state."""
+        raise NotImplementedError
+
+    def can_end(self, state):
+        """Tells if the string read up to the given state can end."""
+        raise NotImplementedError
+
+    def scan(self, string):
+        """Checks if the given string is well-formed.
+
+        Arguments:
+            string (str): the string that needs to be evaluated.
+        Returns:
+            bool: well-formedness value of a string.
+        """
+        state = self.initial_state()
+        for s in string:
+            state = self.step(state, s)
+            if state is None:
+                return False
+        return self.can_end(state)
+
+    def product(self, alphabet):
+        """Builds the product automaton of the tier automata, keeping only
+        the states from which the end of the string can be reached.
+
+        Arguments:
+            alphabet (list): symbols that can be generated.
+        Returns:
+            dict: {state: [(symbol, next_state), ...]}, where the end of
+                the string is represented by the end symbol and the
+                next state None.
+        """
+        start = self.initial_state()
+        transitions = {}
+        agenda = [start]
+        while agenda:
+            state = agenda.pop()
+            if state in transitions:
+                continue
+            moves = []
+            for symbol in alphabet:
+                new = self.step(state, symbol)
+                if new is not None:
+                    moves.append((symbol, new))
+                    if new not in transitions:
+                        agenda.append(new)
+            if self.can_end(state):
+                moves.append((self.edges[1], None))
+            transitions[state] = moves
+
+        # keep the states from which the end can be reached
+        incoming = {state: [] for state in transitions}
+        for state, moves in transitions.items():
+            for symbol, new in moves:
+                if new is not None:
+                    incoming[new].append(state)
+        useful = {q for q in transitions if self.can_end(q)}
+        agenda = list(useful)
+        while agenda:
+            for prev in incoming[agenda.pop()]:
+                if prev not in useful:
+                    useful.add(prev)
+                    agenda.append(prev)
+
+        return {
+            state: [(s, new) for s, new in moves if new is None or new in useful]
+            for state, moves in transitions.items()
+            if state in useful
+        }
+
+    def table(self, alphabet):
+        """Encodes the states of the product automaton as integers.
+
+        Arguments:
+            alphabet (list): symbols that can be generated.
+        Returns:
+            list: for every state, a list of pairs (next symbol, next
+                state); the initial state is 0, and the end of the
+                string is encoded as -1. The list is empty if the
+                grammar does not generate any strings.
+        """
+        automaton = self.product(alphabet)
+        start = self.initial_state()
+        if start not in automaton:
+            return []
+
+        states = [start] + [q for q in automaton if q != start]
+        index = {q: i for i, q in enumerate(states)}
+        return [
+            [(s, -1 if q is None else index[q]) for s, q in automaton[state]]
+            for state in states
+        ]
+
+
+class SLAcceptor(Acceptor):
+    """A compiled acceptor of an SL or a TSL grammar.
+
+    Symbols are encoded as small integers and the ngrams of the grammar
+    as integers packed in base |symbols|. A string is read once, keeping
+    the packed last k-1 symbols, and is rejected on the first violation.
+    A state is a pair of the packed last k-1 symbols and of the number
+    of the next windows that contain a symbol unknown to the grammar:
+    such windows cannot contain a listed ngram.
+    Attributes:
+        symbols (SymbolTable): the encoding of the symbols;
+        code (dict): mapping of symbols to integers;
+        base (int): number of encoded symbols;
+        ngrams (set or PackedNgrams): the packed ngrams of the grammar;
+        k (int): locality window;
+        edges (list): start- and end-symbols of the grammar;
+        positive (bool): True if the grammar lists allowed ngrams;
+        tier (set): symbols that are read, the others are skipped; None
+            if all symbols are read;
+        alphabet (set): symbols that can occur in a string; None if any
+            symbol can occur.
+    """
+
+    def __init__(
+        self,
+        symbols,
+        ngrams,
+        k=2,
+        edges=[">", "<"],
+        polar="p",
+        tier=None,
+        alphabet=None,
+    ):
+        """Compiles the SL grammar given by its packed ngrams, see
+        `SymbolTable.pack_all`."""
+        self.symbols = symbols
+        self.code = symbols.code
+        self.base = symbols.base
+        self.ngrams = ngrams
+        self.k = k
+        self.edges = edges
+        self.positive = polar == "p"
+        self.tier = None if tier is None else set(tier) | set(edges)
+        self.alphabet = None if alphabet is None else set(alphabet)
+
+    def initial_state(self):
+        """Returns the state before reading the first symbol."""
+        return (self.symbols.pack((self.edges[0],) * (self.k - 1)), 0)
+
+    def step(self, state, symbol):
+        """Reads a single symbol in the given state.
+
+        Arguments:
+            state (tuple): the current state;
+            symbol (str): the symbol to read.
+        Returns:
+            tuple: the next state, or None if the symbol completes an
+                ngram that violates the grammar.
+        """
+        if self.tier is not None and symbol not in self.tier:
+            return state
+
+        last, blind = state
+        c = self.code.get(symbol)
+        if c is None:
+            return None if self.positive else (0, self.k - 1)
+        packed = last * self.base + c
+        if blind:
+            blind -= 1
+        elif (packed in self.ngrams) != self.positive:
+            return None
+        return (packed % self.base ** (self.k - 1), blind)
+
+    def can_end(self, state):
+        """Tells if the string read up to the given state can end."""
+        for i in range(self.k - 1):
+            state = self.step(state, self.edges[1])
+            if state is None:
+                return False
+        return True
+
+    def scan(self, string):
+        """Checks if the given string is well-formed.
+
+        Arguments:
+            string (str or tuple): the string that needs to be evaluated.
+        Returns:
+            bool: well-formedness value of a string.
+        """
+        if isinstance(string, str):
+            string = string.strip()
+        if self.alphabet is not None and not self.alphabet.issuperset(string):
+            return False
+
+        base, code, ngrams, tier = self.base, self.code, self.ngrams, self.tier
+        window = base ** (self.k - 1)
+        last, blind = self.initial_state()
+        for s in chain(string, [self.edges[1]] * (self.k - 1)):
+            if tier is not None and s not in tier:
+                continue
+            c = code.get(s)
+            if c is None:
+                if self.positive:
+                    return False
+                last, blind = 0, self.k - 1
+                continue
+            packed = last * base + c
+            if blind:
+                blind -= 1
+            elif (packed in ngrams) != self.positive:
+                return False
+            last = packed % window
+
+        return True
+
+
+class MTSLAcceptor(Acceptor):
+    """A compiled acceptor of an MTSL grammar.
+
+    Symbols are encoded as small integers, every tier as a bitmask over
+    these integers, and the ngrams of every tier as integers packed in
+    base |symbols|. A string is read once, keeping the last k-1 tier
+    symbols of every tier, and is rejected on the first violation.
+    Attributes:
+        symbols (SymbolTable): the encoding of the symbols;
+        code (dict): mapping of symbols to integers;
+        base (int): number of encoded symbols;
+        k (int): locality window;
+        edges (list): start- and end-symbols of the grammar;
+        positive (bool): True if the grammar lists allowed ngrams;
+        masks (list): bitmasks of the tiers;
+        ngrams (list): packed ngrams of the tiers;
+        tiers_of (dict): indices of the tiers every symbol belongs to.
+    """
+
+    def __init__(
+        self, grammar, k=2, edges=[">", "<"], polar="p", symbols=None, packed=None
+    ):
+        """Compiles the given MTSL grammar; the restrictions of the tiers
+        can be given already packed by the given symbol table, see
+        `MTSL.packed_grammar`."""
+        if symbols is None:
+            symbols = SymbolTable(list(edges) + [s for t in grammar for s in t])
+        self.symbols = symbols
+        self.code = self.symbols.code
+        self.base = self.symbols.base
+        self.k = k
+        self.edges = edges
+        self.positive = polar == "p"
+
+        self.masks, self.ngrams = [], []
+        for tier, restrictions in grammar.items():
+            mask = 0
+            for s in list(tier) + list(edges):
+                mask |= 1 << self.code[s]
+            self.masks.append(mask)
+            if packed is not None:
+                self.ngrams.append(packed[tier])
+            else:
+                self.ngrams.append(self.symbols.pack_all(restrictions))
+
+        self.tiers_of = {}
+        for s, c in self.code.items():
+            tiers = [t for t, m in enumerate(self.masks) if (m >> c) & 1]
+            if tiers:
+                self.tiers_of[s] = tiers
+
+    def initial_state(self):
+        """Returns the state before reading the first symbol: a tuple with
+        the packed last k-1 tier symbols of every tier."""
+        start = self.symbols.pack((self.edges[0],) * (self.k - 1))
+        return (start,) * len(self.masks)
+
+    def step(self, state, symbol):
+        """Reads a single symbol in the given state.
+
+        Arguments:
+            state (tuple): the current state;
+            symbol (str): the symbol to read.
+        Returns:
+            tuple: the next state, or None if the symbol violates the
+                grammar on one of its tiers.
+        """
+        tiers = self.tiers_of.get(symbol)
+        if tiers is None:
+            return state
+
+        window = self.base ** (self.k - 1)
+        c = self.code[symbol]
+        new = list(state)
+        for t in tiers:
+            packed = state[t] * self.base + c
+            if (packed in self.ngrams[t]) != self.positive:
+                return None
+            new[t] = packed % window
+        return tuple(new)
+
+    def can_end(self, state):
+        """Tells if the string read up to the given state can end."""
+        for i in range(self.k - 1):
+            state = self.step(state, self.edges[1])
+            if state is None:
+                return False
+        return True
+
+    def scan(self, string):
+        """Checks if the given string is well-formed.
+
+        Arguments:
+            string (str): the string that needs to be evaluated.
+        Returns:
+            bool: well-formedness value of a string.
+        """
+        window = self.base ** (self.k - 1)
+        last = list(self.initial_state())
+        tiers_of, code, ngrams = self.tiers_of, self.code, self.ngrams
+
+        if isinstance(string, str):
+            string = string.strip()
+        for s in chain(string, [self.edges[1]] * (self.k - 1)):
+            tiers = tiers_of.get(s)
+            if tiers is None:
+                continue
+            c = code[s]
+            for t in tiers:
+                packed = last[t] * self.base + c
+                if (packed in ngrams[t]) != self.positive:
+                    return False
+                last[t] = packed % window
+
+        return True
+
+
+class SPAcceptor(Acceptor):
+    """A compiled acceptor of an SP grammar.
+
+    A state is the bitmask of the subsequences of the string read so far
+    that are proper prefixes of banned k-long subsequences; other
+    subsequences cannot lead to a violation and are not tracked. A symbol
+    can be read if none of the (k-1)-long subsequences in the state forms
+    a banned subsequence with it, which is a single bitwise test.
+
+    Symbols outside of the alphabet are skipped by negative grammars, as
+    they are not part of any listed subsequence. Positive grammars reject
+    them, but accept any string shorter than k, which has no k-long
+    subsequences, see `scan`.
+    Attributes:
+        k (int): locality window;
+        edges (list): start- and end-symbols of the grammar;
+        positive (bool): True if the grammar lists allowed subsequences;
+        bit (dict): mapping of the tracked subsequences to bits;
+        banned (dict): for every symbol, the bitmask of the (k-1)-long
+            subsequences that cannot be followed by it;
+        extend (dict): for every symbol, pairs of bits of tracked
+            subsequences and of their tracked extensions by the symbol.
+    """
+
+    def __init__(self, grammar, alphabet, k=2, edges=[">", "<"], polar="p"):
+        """Compiles the given SP grammar."""
+        self.k = k
+        self.edges = edges
+        self.positive = polar == "p"
+        listed = set(tuple(i) for i in grammar)
+        banned_seqs = [
+            seq
+            for seq in product(alphabet, repeat=k)
+            if (seq in listed) != (polar == "p")
+        ]
+
+        self.bit = {(): 1}
+        for length in range(1, k):
+            for seq in banned_seqs:
+                if seq[:length] not in self.bit:
+                    self.bit[seq[:length]] = 1 << len(self.bit)
+
+        self.banned = {s: 0 for s in alphabet}
+        for seq in banned_seqs:
+            self.banned[seq[-1]] |= self.bit[seq[:-1]]
+
+        self.extend = {}
+        for s in alphabet:
+            self.extend[s] = [
+                (b, self.bit[seq + (s,)])
+                for seq, b in self.bit.items()
+                if len(seq) < k - 1 and seq + (s,) in self.bit
+            ]
+
+    def initial_state(self):
+        """Returns the state before reading the first symbol."""
+        return self.bit[()]
+
+    def step(self, state, symbol):
+        """Reads a single symbol in the given state.
+
+        Arguments:
+            state (int): the current state;
+            symbol (str): the symbol to read.
+        Returns:
+            int: the next state, or None if reading the symbol creates
+                a banned subsequence.
+        """
+        if symbol not in self.banned:
+            return None if self.positive else state
+        if state & self.banned[symbol]:
+            return None
+        added = 0
+        for old, new in self.extend[symbol]:
+            if state & old:
+                added |= new
+        return state | added
+
+    def scan(self, string):
+        """Checks if the given string is well-formed: under a positive
+        grammar, strings shorter than k are well-formed even if they have
+        symbols outside of the alphabet.
+
+        Arguments:
+            string (str): the string that needs to be evaluated.
+        Returns:
+            bool: well-formedness value of a string.
+        """
+        if self.positive and len(string) < self.k:
+            return True
+        return super().scan(string)
+
+    def can_end(self, state):
+        """Every prefix of a well-formed string is well-formed."""
+        return True
+
+
+class PathCounts(object):
+    """Counts of the strings accepted by an automaton up to a given length,
+    used to count, list and draw the strings without generating all of
+    them. Strings are ordered by the order of the moves of every state,
+    which follows the order of their symbols.
+
+    Subclasses define the initial state, the moves of a state, and the
+    number of strings of a given length accepted from a state.
+    Attributes:
+        max_len (int): the maximal length of the strings.
+    """
+
+    def initial_state(self):
+        """Returns the initial state of the automaton."""
+        raise NotImplementedError
+
+    def successors(self, state):
+        """Returns the pairs (symbol, next state) of the moves from the
+        given state, without the end of the string."""
+        raise NotImplementedError
+
+    def count(self, state, remaining):
+        """Returns the number of strings of the given length accepted from
+        the given state."""
+        raise NotImplementedError
+
+    def sizes(self):
+        """Returns the list of the numbers of strings of every length from
+        0 to max_len."""
+        start = self.initial_state()
+        return [self.count(start, l) for l in range(self.max_len + 1)]
+
+    def unrank(self, length, index):
+        """Finds the string of the given length with the given index among
+        the strings of that length.
+
+        Arguments:
+            length (int): the length of the string;
+            index (int): the index of the string.
+        Returns:
+            list: the symbols of the string.
+        """
+        state, word = self.initial_state(), []
+        for remaining in range(length - 1, -1, -1):
+            for symbol, q in self.successors(state):
+                c = self.count(q, remaining)
+                if index < c:
+                    word.append(symbol)
+                    state = q
+                    break
+                index -= c
+
+        return word
+
+    def strings(self, length):
+        """Lists the strings of the given length in their order, generating
+        them lazily.
+
+        Arguments:
+            length (int): the length of the strings.
+        Returns:
+            generator: tuples of the symbols of the strings.
+        """
+        stack = [(self.initial_state(), length, ())]
+        while stack:
+            state, remaining, word = stack.pop()
+            if not remaining:
+                yield word
+                continue
+            for symbol, q in reversed(self.successors(state)):
+                if self.count(q, remaining - 1):
+                    stack.append((q, remaining - 1, word + (symbol,)))
+
+
+class TableCounts(PathCounts):
+    """Counts of the strings accepted from every state of an integer state
+    table, computed for all states length by length.
+
+    Attributes:
+        table (list): for every state, a list of pairs (next symbol,
+            next state); the initial state is 0, and the end of the
+            string is encoded as -1;
+        max_len (int): the maximal length of the strings;
+        counts (list): the l-th element lists the number of strings of
+            length l accepted from every state.
+    """
+
+    def __init__(self, table, max_len):
+        """Counts the strings of the given state table."""
+        self.table = [sorted(moves) for moves in table]
+        self.max_len = max_len
+        self.counts = [[int(any(q < 0 for _, q in moves)) for moves in self.table]]
+        for l in range(max_len):
+            prev = self.counts[-1]
+            self.counts.append(
+                [sum(prev[q] for _, q in moves if q >= 0) for moves in self.table]
+            )
+
+    def initial_state(self):
+        """Returns the initial state of the table."""
+        return 0
+
+    def successors(self, state):
+        """Returns the moves of the state that do not end the string."""
+        return [(s, q) for s, q in self.table[state] if q >= 0]
+
+    def count(self, state, remaining):
+        """Returns the number of strings of the given length accepted from
+        the given state."""
+        if not self.table:
+            return 0
+        return self.counts[remaining][state]
+
+
+class AcceptorCounts(PathCounts):
+    """Counts of the strings accepted by a compiled acceptor, computed
+    without building its whole automaton: only the states that are
+    reached while counting are explored, and the number of strings
+    accepted from a state is memoized per (state, remaining length).
+
+    Attributes:
+        acceptor (Acceptor): the compiled acceptor;
+        alphabet (list): the symbols that can be read, sorted;
+        max_len (int): the maximal length of the strings;
+        moves (dict): the moves of the explored states;
+        memo (dict): the counts, {(state, remaining length): count}.
+    """
+
+    def __init__(self, acceptor, alphabet, max_len):
+        """Prepares the counting of the strings of the acceptor."""
+        self.acceptor = acceptor
+        self.alphabet = sorted(alphabet)
+        self.max_len = max_len
+        self.moves = {}
+        self.memo = {}
+
+    def initial_state(self):
+        """Returns the initial state of the acceptor."""
+        return self.acceptor.initial_state()
+
+    def successors(self, state):
+        """Returns the moves from the state, exploring it if needed."""
+        moves = self.moves.get(state)
+        if moves is None:
+            moves = []
+            for symbol in self.alphabet:
+                new = self.acceptor.step(state, symbol)
+                if new is not None:
+                    moves.append((symbol, new))
+            self.moves[state] = moves
+        return moves
+
+    def explore(self, limit):
+        """Explores the states reachable within max_len symbols breadth
+        first, stopping once more than `limit` states are found.
+
+        Arguments:
+            limit (int): the maximal number of explored states.
+        Returns:
+            bool: True if all the reachable states were explored.
+        """
+        layer, seen = [self.initial_state()], {self.initial_state()}
+        for depth in range(self.max_len):
+            new_layer = []
+            for state in layer:
+                for symbol, q in self.successors(state):
+                    if q not in seen:
+                        seen.add(q)
+                        new_layer.append(q)
+                if len(seen) > limit:
+                    return False
+            layer = new_layer
+        return True
+
+    def count(self, state, remaining):
+        """Returns the number of strings of the given length accepted from
+        the given state, counting the strings of the next states first."""
+        memo = self.memo
+        stack = [(state, remaining)]
+        while stack:
+            q, r = stack[-1]
+            if (q, r) in memo:
+                stack.pop()
+            elif not r:
+                memo[(q, r)] = int(self.acceptor.can_end(q))
+                stack.pop()
+            else:
+                moves = self.successors(q)
+                missing = [(p, r - 1) for _, p in moves if (p, r - 1) not in memo]
+                if missing:
+                    stack.extend(missing)
+                else:
+                    memo[(q, r)] = sum(memo[(p, r - 1)] for _, p in moves)
+                    stack.pop()
+
+        return memo[(state, remaining)]
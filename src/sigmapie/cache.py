@@ -0,0 +1,133 @@
+"""An on-disk cache of learned grammars. Copyright (C) 2019  Alena
+Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+from sigmapie.storage import *
+
+# options of the learners that control how the grammar is learned but do
+# not change the learned grammar, and are left out of the fingerprints
+EXECUTION_OPTIONS = ("workers", "progress", "cancel", "timeout")
+
+
+class GrammarCache(object):
+    """A folder of learned grammars indexed by the fingerprints of the
+    learning settings and of the training data.
+
+    A grammar that was already learned with the same class, k, polarity,
+    edges, alphabet, tier, learning options and data is restored from the
+    folder instead of being learned again. The least recently used
+    grammars are removed once the folder exceeds its size limit.
+    Attributes:
+        folder (str): the folder with the saved grammars;
+        max_size (int): the size limit of the folder in bytes.
+    """
+
+    def __init__(self, folder, max_size=256 * 1024 * 1024):
+        """Initializes the GrammarCache object."""
+        self.folder = folder
+        self.max_size = max_size
+        os.makedirs(folder, exist_ok=True)
+
+    def fingerprint(self, grammar, options=None):
+        """Computes the fingerprint of the learning problem: the settings
+        of the grammar, the options of the learner and the data.
+
+        Arguments:
+            grammar (L): the grammar that needs to be learned;
+            options (dict): keyword arguments of the learner; the ones in
+                EXECUTION_OPTIONS are ignored.
+        Returns:
+            str: a hexadecimal digest.
+        """
+        options = {
+            k: v for k, v in (options or {}).items() if k not in EXECUTION_OPTIONS
+        }
+        settings = {
+            "class": type(grammar).__name__,
+            "k": grammar.k,
+            "polar": grammar.check_polarity(),
+            "edges": grammar.edges,
+            "alphabet": grammar.alphabet,
+            "tier": getattr(grammar, "tier", None),
+            "options": options,
+            "version": FORMAT_VERSION,
+        }
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        for item in grammar.data:
+            if not isinstance(item, str):
+                item = json.dumps(list(item))
+            digest.update(item.encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def path(self, key):
+        """Returns the path of the grammar with the given fingerprint."""
+        return os.path.join(self.folder, key + ".sigmapie")
+
+    def learn(self, grammar, **options):
+        """Learns the grammar, or restores it if it was already learned from
+        the same data with the same settings. The training data of the
+        grammar is kept in both cases.
+
+        Arguments:
+            grammar (L): the grammar that needs to be learned;
+            **options: keyword arguments passed to `grammar.learn`.
+        Returns:
+            bool: True if the grammar was restored from the cache.
+        """
+        key = self.fingerprint(grammar, options)
+        path = self.path(key)
+        data = grammar.data
+
+        if os.path.exists(path):
+            try:
+                header, sections = read_sections(path)
+            except (OSError, ValueError):
+                os.remove(path)
+            else:
+                os.utime(path)
+                grammar.restore(header, sections)
+                grammar.data = data
+                return True
+
+        grammar.learn(**options)
+        handle, temporary = tempfile.mkstemp(dir=self.folder)
+        os.close(handle)
+        grammar.save(temporary)
+        os.replace(temporary, path)
+        self.evict()
+        return False
+
+    def evict(self):
+        """Removes the least recently used grammars until the folder fits
+        into its size limit."""
+        entries = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".sigmapie"):
+                stat = os.stat(os.path.join(self.folder, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """Removes all grammars from the cache."""
+        for name in os.listdir(self.folder):
+            if name.endswith(".sigmapie"):
+                os.remove(os.path.join(self.folder, name))
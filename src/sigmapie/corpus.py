@@ -0,0 +1,78 @@
+"""A class of corpora streamed from files. Copyright (C) 2019  Alena
+Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import gzip
+
+
+class Corpus(object):
+    """A corpus of words read lazily from a plain-text, TSV or gzipped file.
+
+    The file is read anew on every iteration and only one line is kept
+    in memory, so a corpus can be passed as `data` to the learners and
+    to `extract_alphabet` instead of a list of strings.
+    Attributes:
+        path (str): path of the file; files ending with ".gz" are read
+            as gzip archives;
+        column (int): index of the column containing the words in a
+            file of delimited columns; None reads every line as a word;
+        delimiter (str): the column delimiter;
+        separator (str): the separator of the symbols of a word, for
+            symbols longer than a single character; if given, words are
+            read as tuples of symbols, and if None, as strings;
+        tokenizer (Tokenizer): converts unseparated words into arrays
+            of the ids of their multi-character segments, which are read
+            as symbols, see `Tokenizer`;
+        encoding (str): encoding of the file.
+    """
+
+    def __init__(
+        self,
+        path,
+        column=None,
+        delimiter="\t",
+        separator=None,
+        tokenizer=None,
+        encoding="utf-8",
+    ):
+        """Initializes the Corpus object."""
+        self.path = path
+        self.column = column
+        self.delimiter = delimiter
+        self.separator = separator
+        self.tokenizer = tokenizer
+        self.encoding = encoding
+
+    def open(self):
+        """Opens the file of the corpus for reading.
+
+        Returns:
+            file: the file object in text mode.
+        """
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, "rt", encoding=self.encoding)
+        return open(self.path, encoding=self.encoding)
+
+    def __iter__(self):
+        """Reads the words of the corpus one by one, skipping empty ones."""
+        with self.open() as f:
+            for line in f:
+                if self.column is not None:
+                    fields = line.rstrip("\r\n").split(self.delimiter)
+                    if len(fields) <= self.column:
+                        continue
+                    line = fields[self.column]
+                word = line.strip()
+                if not word:
+                    continue
+                if self.separator is not None:
+                    yield tuple(s for s in word.split(self.separator) if s)
+                elif self.tokenizer is not None:
+                    yield self.tokenizer.tokenize(word)
+                else:
+                    yield word
@@ -40,7 +40,8 @@ class FSM(object):
         """Scans a given string using the learned SL grammar.
 
         Arguments:
-            string (str): a string that needs to be scanned.
+            string (str or tuple): an annotated string or tuple of
+                symbols that needs to be scanned.
         Returns:
             bool: well-formedness value of the string.
         """
@@ -52,14 +53,16 @@ class FSM(object):
                 " transitions using grammar.fsmize()."
             )
 
+        # the windows that can be read, built once per string
         k = len(self.transitions[0][0]) + 1
-        for i in range(k - 1, len(string)):
-            move_to_next = []
-            for j in self.transitions:
-                can_read = string[(i - k + 1) : (i + 1)] == "".join(j[0]) + j[1]
-                move_to_next.append(can_read)
+        if isinstance(string, str):
+            windows = {"".join(j[0]) + j[1] for j in self.transitions}
+        else:
+            windows = {tuple(j[0]) + (j[1],) for j in self.transitions}
+            string = tuple(string)
 
-            if not any(move_to_next):
+        for i in range(k - 1, len(string)):
+            if string[(i - k + 1) : (i + 1)] not in windows:
                 return False
 
         return True
@@ -112,6 +115,7 @@ class FSM(object):
                     if p[0] == s[2]:
                         mod_reachable.append(p)
                         mod_updated.remove(p)
+                        break
             updated = mod_updated[:]
             reachable.extend(mod_reachable)
 
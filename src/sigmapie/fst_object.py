@@ -8,6 +8,36 @@ option) any later version.
 """
 
 from copy import deepcopy
+from array import array
+from sigmapie.storage import *
+from sigmapie.symbols import *
+
+# segment ids are written as the characters of the private use area, so
+# that the string operations of the transducers handle segments
+PRIVATE_USE = 0xE000
+PRIVATE_USE_SIZE = 6400
+
+
+def ids_to_text(ids):
+    """Writes every segment id as a single character.
+
+    Arguments:
+        ids (sequence): segment ids, see `Tokenizer.encode`.
+    Returns:
+        str: the characters of the ids.
+    """
+    return "".join(chr(PRIVATE_USE + i) for i in ids)
+
+
+def text_to_ids(text):
+    """Reads the segment ids written by `ids_to_text`.
+
+    Arguments:
+        text (str): the characters of the ids.
+    Returns:
+        array: the segment ids.
+    """
+    return array("I", [ord(c) - PRIVATE_USE for c in text])
 
 
 class FST:
@@ -18,8 +48,13 @@ class FST:
         Sigma (list): a list of symbols of the input alphabet;
         Gamma (list): a list of symbols of the output alphabet;
         qe (str): name of the unique initial state;
-        E (list): a list of transitions;
-        stout (dict): a collection of state outputs.
+        E (list): a list of transitions; a `RecordArray` decoding the
+            transitions on access if the transducer was loaded from
+            a memory map;
+        stout (dict): a collection of state outputs;
+        segments (tuple): tokenizers of the input and output segments
+            if the transducer reads and writes segment ids written as
+            characters, see `ids_to_text`; otherwise None.
     """
 
     def __init__(self, Sigma=None, Gamma=None):
@@ -30,29 +65,33 @@ class FST:
         self.qe = ""
         self.E = None
         self.stout = None
+        self.segments = None
 
     def rewrite(self, w):
         """Rewrites the given string with respect to the rules represented in
         the current FST.
 
         Arguments:
-            w (str): a string that needs to be rewritten.
+            w (str or tuple): a string that needs to be rewritten; for
+                a transducer over segments, also a tuple of segments.
         Outputs:
-            str: the translation of the input string.
+            str or tuple: the translation of the input string; a tuple
+                of segments for a transducer over segments.
         """
         if self.Q == None:
             raise ValueError("The transducer needs to be constructed.")
+        if self.segments is not None:
+            w = ids_to_text(self.segments[0].encode(w))
 
         # move through the transducer and write the output
         result = ""
         current_state = ""
         moved = False
         for i in range(len(w)):
-            for tr in self.E:
-                if tr[0] == current_state and tr[1] == w[i]:
-                    result += tr[2]
-                    current_state, moved = tr[3], True
-                    break
+            tr = self.transition(current_state, w[i])
+            if tr is not None:
+                result += tr[2]
+                current_state, moved = tr[3], True
             if moved == False:
                 raise ValueError(
                     "This string cannot be read by the current transducer."
@@ -62,8 +101,27 @@ class FST:
         if self.stout[current_state] != "*":
             result += self.stout[current_state]
 
+        if self.segments is not None:
+            return self.segments[1].decode(text_to_ids(result))
         return result
 
+    def transition(self, state, symbol):
+        """Finds the transition from the given state on the given symbol.
+
+        Arguments:
+            state (str): the state;
+            symbol (str): the input symbol.
+        Returns:
+            tuple: the transition (state, symbol, output, next state),
+                or None if there is no such transition.
+        """
+        if isinstance(self.E, RecordArray):
+            return self.E.find(state, symbol)
+        for tr in self.E:
+            if tr[0] == state and tr[1] == symbol:
+                return tr
+        return None
+
     def copy_fst(self):
         """Produces a deep copy of the current FST.
 
@@ -74,7 +132,75 @@ class FST:
         T.Q = deepcopy(self.Q)
         T.Sigma = deepcopy(self.Sigma)
         T.Gamma = deepcopy(self.Gamma)
-        T.E = deepcopy(self.E)
+        T.E = deepcopy(list(self.E))
         T.stout = deepcopy(self.stout)
+        T.segments = self.segments
+
+        return T
+
+    def save(self, path):
+        """Saves the transducer in a compact binary format: every string
+        is stored once, and the states, transitions and state outputs
+        as arrays of indices of the strings.
+
+        Arguments:
+            path (str): the path of the file.
+        """
+        if self.Q is None:
+            raise ValueError("The transducer needs to be constructed.")
+
+        strings, index = [], {}
+
+        def encode(values):
+            codes = array("I")
+            for v in values:
+                if v not in index:
+                    index[v] = len(strings)
+                    strings.append(v)
+                codes.append(index[v])
+            return codes
+
+        sections = {
+            "Q": encode(self.Q),
+            "E": encode(s for tr in self.E for s in tr),
+            "stout": encode(s for pair in self.stout.items() for s in pair),
+        }
+        for name in ("Sigma", "Gamma"):
+            if getattr(self, name) is not None:
+                sections[name] = encode(getattr(self, name))
+
+        header = {"class": "FST", "qe": self.qe, "strings": strings}
+        if self.segments is not None:
+            header["segments"] = [t.segments for t in self.segments]
+        write_sections(path, header, sections)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Loads a transducer saved by `save`.
+
+        Arguments:
+            path (str): the path of the file;
+            mmap (bool): maps the file into memory instead of reading it;
+                the transitions stay in the mapped pages, which are
+                shared by all processes that load the same file, and
+                are only decoded when they are read, see `RecordArray`.
+        Returns:
+            FST: the loaded transducer.
+        """
+        header, sections = read_sections(path, use_mmap=mmap)
+        if header["class"] != "FST":
+            raise ValueError("The file does not contain a transducer.")
+
+        strings = header["strings"]
+        transitions = RecordArray(strings, sections.pop("E"), 4)
+        decoded = {name: [strings[i] for i in s] for name, s in sections.items()}
+        T = cls(decoded.get("Sigma"), decoded.get("Gamma"))
+        T.Q = decoded["Q"]
+        T.qe = header["qe"]
+        T.E = transitions if mmap else list(transitions)
+        stout = decoded["stout"]
+        T.stout = dict(zip(stout[::2], stout[1::2]))
+        if "segments" in header:
+            T.segments = tuple(Tokenizer(s) for s in header["segments"])
 
         return T
@@ -7,8 +7,35 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+from copy import copy
+from array import array
 from itertools import product
+from random import Random
+from multiprocessing import Pool
 from sigmapie.helper import *
+from sigmapie.symbols import *
+from sigmapie.storage import *
+from sigmapie.acceptors import *
+
+# number of strings generated with a single random stream
+CHUNK_SIZE = 1000
+
+# grammar and compiled structures shared by the worker processes
+_chunk_worker_state = None
+
+
+def _init_chunk_worker(grammar, shared):
+    """Stores the grammar and its compiled structures in a worker process."""
+    global _chunk_worker_state
+    _chunk_worker_state = (grammar, shared)
+
+
+def _chunk_worker(task):
+    """Runs a method of the grammar on a single chunk inside a worker
+    process."""
+    grammar, shared = _chunk_worker_state
+    method, chunk = task
+    return getattr(grammar, method)(*(shared + chunk))
 
 
 class L(object):
@@ -23,6 +50,9 @@ class L(object):
         data (list): input data;
         edges (list): start- and end-symbols for the grammar;
         polar ("p" or "n"): polarity of the grammar.
+    Structures derived from the grammar are cached and dropped whenever
+    the grammar, alphabet, k, edges, tier, ngram counts or polarity are
+    changed.
     """
 
     def __init__(
@@ -41,6 +71,33 @@ class L(object):
         self.data = [] if data is None else data
         self.edges = edges
 
+    def __setattr__(self, name, value):
+        """Drops the cached structures when an attribute that defines the
+        grammar is changed."""
+        if name in (
+            "grammar",
+            "alphabet",
+            "k",
+            "edges",
+            "tier",
+            "counts",
+            "_L__polarity",
+        ):
+            self.__dict__["_cache"] = {}
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        """Leaves the cached structures out of pickles: they are rebuilt
+        when needed, and can hold views of a memory-mapped file."""
+        state = dict(self.__dict__)
+        state["_cache"] = {}
+        return state
+
+    def clear_cache(self):
+        """Drops the cached structures derived from the grammar: needs to
+        be called after the grammar was modified in place."""
+        self._cache = {}
+
     def extract_alphabet(self):
         """Extracts alphabet from the given data or grammar and saves it into
         the 'alphabet' attribute.
@@ -117,13 +174,9 @@ class L(object):
         if not ((self.edges[0] in symb) or (self.edges[1] in symb)):
             symb += self.edges
 
-        combinations = product(symb, repeat=k)
-        ngrams = []
-        for ngram in combinations:
-            if self.well_formed_ngram(ngram) and (ngram not in ngrams):
-                ngrams.append(ngram)
-
-        return ngrams
+        table = SymbolTable(symb)
+        combinations = product(table.symbols, repeat=k)
+        return [ngram for ngram in combinations if self.well_formed_ngram(ngram)]
 
     def opposite_polarity(self, symbols):
         """Returns the grammar opposite to the one given.
@@ -134,10 +187,222 @@ class L(object):
             list: ngrams of the opposite polarity.
         """
         all_ngrams = self.generate_all_ngrams(symbols, self.k)
-        opposite = [i for i in all_ngrams if i not in self.grammar]
+        table = SymbolTable(list(self.edges) + list(symbols))
+        listed = table.pack_all(tuple(i) for i in self.grammar)
+        opposite = [i for i in all_ngrams if table.pack(i) not in listed]
 
         return opposite
 
+    def symbol_table(self):
+        """Returns the integer encoding of the edges, the alphabet and the
+        symbols of the grammar; cached until the grammar changes.
+
+        Returns:
+            SymbolTable: the shared symbol table.
+        """
+        if "symbols" not in self._cache:
+            symbols = list(self.edges) + list(self.alphabet or [])
+            ngrams = self.grammar
+            if isinstance(ngrams, dict):
+                ngrams = list(ngrams) + [n for v in ngrams.values() for n in v]
+            for ngram in ngrams:
+                symbols.extend(ngram)
+            self._cache["symbols"] = SymbolTable(symbols)
+        return self._cache["symbols"]
+
+    def packed_grammar(self):
+        """Returns the ngrams of the grammar packed into integers, see
+        `SymbolTable.pack`; cached until the grammar changes.
+
+        Returns:
+            set or PackedNgrams: the packed ngrams, searched in place in
+                the mapped file if the grammar was loaded with mmap, see
+                `map_packed`.
+        """
+        if "packed" not in self._cache:
+            table = self.symbol_table()
+            self._cache["packed"] = table.pack_all(self.grammar)
+        return self._cache["packed"]
+
+    @property
+    def acceptor(self):
+        """The compiled acceptor of the current grammar, or None if the
+        grammar was not compiled since it was last changed."""
+        return self._cache.get("acceptor")
+
+    def compile(self):
+        """Compiles the grammar into an acceptor that is used by `scan` and
+        by the generation of strings.
+
+        The acceptor is dropped whenever the grammar, the alphabet, k,
+        the edges, the tier or the polarity are changed, and is compiled
+        again when it is needed; modifying the grammar in place requires
+        calling this method or `clear_cache` again.
+        Returns:
+            Acceptor: the compiled acceptor.
+        """
+        self.clear_cache()
+        self._cache["acceptor"] = self.compile_acceptor()
+        return self._cache["acceptor"]
+
+    def get_acceptor(self):
+        """Returns the compiled acceptor, compiling the grammar if it was
+        not compiled yet or was changed since.
+
+        Returns:
+            Acceptor: the acceptor of the current grammar.
+        """
+        if "acceptor" not in self._cache:
+            self._cache["acceptor"] = self.compile_acceptor()
+        return self._cache["acceptor"]
+
+    def compile_acceptor(self):
+        """Builds the acceptor of the current grammar, see `compile`.
+
+        Implemented by the grammar classes.
+        """
+        raise NotImplementedError
+
+    def join_symbols(self, symbols):
+        """Builds a generated string from its symbols.
+
+        Arguments:
+            symbols (list): the symbols of the string.
+        Returns:
+            str or tuple: a string if every symbol of the alphabet is
+                a single character, otherwise a tuple of symbols.
+        """
+        if "segmented" not in self._cache:
+            self._cache["segmented"] = any(
+                not isinstance(s, str) or len(s) != 1 for s in self.alphabet or []
+            )
+        if self._cache["segmented"]:
+            return tuple(symbols)
+        return "".join(symbols)
+
+    def save(self, path, data=False):
+        """Saves the grammar in a compact binary format: the symbols are
+        stored once, and the ngrams as arrays of their codes.
+
+        Arguments:
+            path (str): the path of the file;
+            data (bool): also saves the training data; the data read
+                from a corpus is saved as the list of its words.
+        """
+        header, sections = self.dump(data)
+        write_sections(path, header, sections)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """Loads a grammar saved by `save`.
+
+        Arguments:
+            path (str): the path of the file;
+            mmap (bool): maps the file into memory instead of reading
+                it; the acceptor searches the packed ngrams in the
+                mapped pages, which are shared by all processes that
+                load the same file, see `map_packed`.
+        Returns:
+            L: the loaded grammar.
+        """
+        header, sections = read_sections(path, use_mmap=mmap)
+        if header["class"] != cls.__name__:
+            raise ValueError(
+                "The file contains a grammar of the class "
+                + header["class"]
+                + ", use `"
+                + header["class"]
+                + ".load`."
+            )
+        grammar = cls(polar=header["polar"])
+        grammar.restore(header, sections)
+        if mmap and "packed" in sections:
+            grammar.map_packed(header, sections["packed"])
+        return grammar
+
+    def map_packed(self, header, packed):
+        """Caches the packed ngrams of a memory-mapped file in place of the
+        ones packed from the grammar, see `packed_grammar`.
+
+        Arguments:
+            header (dict): the header of the saved grammar;
+            packed (memoryview): the sorted packed ngrams.
+        """
+        self._cache["symbols"] = SymbolTable(header["symbols"])
+        self._cache["packed"] = PackedNgrams(packed)
+
+    def dump(self, data=False):
+        """Describes the grammar by a header and typed arrays, see `save`.
+
+        Arguments:
+            data (bool): also includes the training data.
+        Returns:
+            tuple: a JSON-serializable header and the arrays.
+        """
+        table = self.symbol_table()
+        header = {
+            "class": type(self).__name__,
+            "alphabet": self.alphabet,
+            "k": self.k,
+            "edges": self.edges,
+            "polar": self.check_polarity(),
+            "symbols": table.symbols,
+        }
+        sections = {"grammar": self.encode_grammar(table, header)}
+        if table.base ** self.k < 1 << 64:
+            sections["packed"] = self.encode_packed(table)
+        if data:
+            # the words of a corpus can be tuples or arrays of segment ids
+            words = [w if isinstance(w, str) else list(w) for w in self.data]
+            sections["data"] = encode_text(words)
+        return header, sections
+
+    def restore(self, header, sections):
+        """Restores the grammar from its description, see `dump`.
+
+        Arguments:
+            header (dict): the header of the saved grammar;
+            sections (dict): the arrays of the saved grammar.
+        """
+        self.alphabet = header["alphabet"]
+        self.k = header["k"]
+        self.edges = header["edges"]
+        self.grammar = self.decode_grammar(header, sections["grammar"])
+        self.data = decode_text(sections["data"]) if "data" in sections else []
+
+    def encode_grammar(self, table, header):
+        """Encodes the ngrams of the grammar as an array of symbol codes.
+
+        Arguments:
+            table (SymbolTable): the encoding of the symbols;
+            header (dict): the header, can be extended by subclasses.
+        Returns:
+            array: the codes, see `encode_ngrams`.
+        """
+        return encode_ngrams(table, self.grammar, self.k)
+
+    def encode_packed(self, table):
+        """Packs the ngrams of the grammar into a sorted array, which can be
+        searched in a memory-mapped file, see `map_packed`.
+
+        Arguments:
+            table (SymbolTable): the encoding of the symbols.
+        Returns:
+            array: the sorted packed ngrams.
+        """
+        return array("Q", sorted(table.pack_all(self.grammar)))
+
+    def decode_grammar(self, header, codes):
+        """Decodes the ngrams of the grammar encoded by `encode_grammar`.
+
+        Arguments:
+            header (dict): the header of the saved grammar;
+            codes (array): the codes of the symbols of the ngrams.
+        Returns:
+            list: the ngrams of the grammar.
+        """
+        return decode_ngrams(header["symbols"], codes, self.k)
+
     def check_polarity(self):
         """Returns the polarity of the grammar ("p" or "n")."""
         if self.__polarity == "p":
@@ -161,3 +426,223 @@ class L(object):
                 self.__polarity = "n"
             elif self.__polarity == "n":
                 self.__polarity = "p"
+
+    def acceptor_table(self):
+        """Encodes the acceptor of the grammar as a table of integer states:
+        for every state, a list of pairs (next symbol, next state), where
+        the initial state is 0 and the end of the string is -1.
+
+        Implemented by the grammar classes.
+        """
+        raise NotImplementedError
+
+    def paths(self, max_len):
+        """Counts the well-formed strings up to the given length, see
+        `PathCounts`; the grammar classes can count the strings without
+        encoding the whole automaton.
+
+        Arguments:
+            max_len (int): the maximal length of the strings.
+        Returns:
+            PathCounts: the counts of the strings.
+        """
+        return TableCounts(self.acceptor_table(), max_len)
+
+    def generate_unique(
+        self, n, paths, by_length=False, safe=True, rng=None, workers=1
+    ):
+        """Generates n distinct well-formed strings up to the given length by
+        drawing their indices without repetitions and decoding them
+        through the counts of the strings per length.
+
+        Arguments:
+            n (int): the number of strings to be generated;
+            paths (PathCounts): the counts of the strings up to the
+                maximal length, see `paths`;
+            by_length (bool): chooses the length of every string
+                uniformly among the lengths that still have unused
+                strings; otherwise all the strings up to the bound are
+                equally likely;
+            safe (bool): if the language has fewer than n strings up to
+                the bound, returns all of them instead of raising
+                a ValueError;
+            rng (Random): the random generator;
+            workers (int): number of processes decoding the drawn
+                indices, see `map_chunks`.
+        Returns:
+            list: generated strings.
+        """
+        rng = make_rng(rng=rng)
+        sizes = paths.sizes()
+        if not any(sizes):
+            raise ValueError(
+                "The grammar does not generate any strings up to the length bound."
+            )
+        if sum(sizes) < n:
+            if not safe:
+                raise ValueError(
+                    "The grammar cannot produce the requested number of "
+                    "strings. Check the grammar, reduce the number, "
+                    "increase the length bound, or allow repetitions."
+                )
+            print(
+                "The grammar cannot produce the requested "
+                "number of strings. Check the grammar, "
+                "reduce the number, or allow repetitions."
+            )
+            n = sum(sizes)
+
+        if by_length:
+            quotas = [0] * len(sizes)
+            lengths = [l for l in range(len(sizes)) if sizes[l]]
+            for i in range(n):
+                l = rng.choice(lengths)
+                quotas[l] += 1
+                if quotas[l] == sizes[l]:
+                    lengths.remove(l)
+            picks = [
+                (l, i)
+                for l in range(len(sizes))
+                for i in sample_indices(sizes[l], quotas[l], rng)
+            ]
+        else:
+            picks = []
+            for i in sample_indices(sum(sizes), n, rng):
+                l = 0
+                while i >= sizes[l]:
+                    i -= sizes[l]
+                    l += 1
+                picks.append((l, i))
+
+        chunks = [(picks[i : i + CHUNK_SIZE],) for i in range(0, n, CHUNK_SIZE)]
+        return self.map_chunks("unrank_chunk", (paths,), chunks, workers)
+
+    def sample_distinct(self, n, draw, safe=True, patience=500):
+        """Generates n distinct strings by calling a random generator of
+        single strings until enough new ones are found, so the strings
+        keep the length distribution of the generator. Used for sampling
+        without repetitions when no length bound is given.
+
+        Arguments:
+            n (int): the number of strings to be generated;
+            draw (callable): generates a single well-formed string;
+            safe (bool): if no new string was found in `patience` draws
+                in a row, returns the strings found so far instead of
+                raising a ValueError;
+            patience (int): the number of draws in a row without a new
+                string after which the grammar is considered exhausted.
+        Returns:
+            list: generated strings in the order they were found.
+        """
+        found, useless_loops = {}, 0
+        while len(found) < n:
+            item = draw()
+            if item in found:
+                useless_loops += 1
+            else:
+                found[item] = None
+                useless_loops = 0
+
+            if useless_loops > patience:
+                if not safe:
+                    raise ValueError(
+                        "The grammar cannot produce the requested number of "
+                        "strings. Check the grammar, reduce the number, "
+                        "or allow repetitions."
+                    )
+                print(
+                    "The grammar cannot produce the requested "
+                    "number of strings. Check the grammar, "
+                    "reduce the number, or allow repetitions."
+                )
+                break
+
+        return list(found)
+
+    def seeded_chunks(self, n, seed=None):
+        """Splits the generation of n strings into chunks of a fixed size,
+        each with its own random stream derived from the seed. The
+        generated sample therefore does not depend on how the chunks are
+        distributed among processes.
+
+        Arguments:
+            n (int): the number of strings to be generated;
+            seed (int): the master seed; if None, the streams are derived
+                from the generator of the `random` module, see `make_rng`.
+        Returns:
+            list: pairs (number of strings, seed) for every chunk.
+        """
+        sizes = [min(CHUNK_SIZE, n - i) for i in range(0, n, CHUNK_SIZE)]
+        return list(zip(sizes, spawn_seeds(seed, len(sizes))))
+
+    def map_chunks(self, method, shared, chunks, workers=1):
+        """Runs a method on every chunk and joins the results, distributing
+        the chunks among worker processes. The workers receive a copy of
+        the grammar without the training data, see `worker_copy`.
+
+        Arguments:
+            method (str): name of the method, called with the shared
+                arguments followed by the arguments of the chunk;
+            shared (tuple): arguments shared by all chunks, such as the
+                compiled automaton of the grammar;
+            chunks (list): tuples of arguments of every chunk;
+            workers (int): number of processes; the default value 1
+                runs all chunks in the current process.
+        Returns:
+            list: the joined results in the order of the chunks.
+        """
+        if workers > 1 and len(chunks) > 1:
+            processes = min(workers, len(chunks))
+            initargs = (self.worker_copy(), shared)
+            with Pool(processes, _init_chunk_worker, initargs) as pool:
+                parts = pool.map(_chunk_worker, [(method, c) for c in chunks])
+        else:
+            parts = [getattr(self, method)(*(shared + c)) for c in chunks]
+
+        return [item for part in parts for item in part]
+
+    def worker_copy(self):
+        """Returns a shallow copy of the grammar without the training data
+        and the cached structures, to be sent to worker processes."""
+        new = copy(self)
+        new.__dict__["data"] = []
+        new.__dict__["_cache"] = {}
+        return new
+
+    def unrank_chunk(self, paths, picks):
+        """Decodes a chunk of indices of strings, see `PathCounts.unrank`.
+
+        Arguments:
+            paths (PathCounts): the counts of the strings, see `paths`;
+            picks (list): pairs (length, index) of the strings.
+        Returns:
+            list: the decoded strings.
+        """
+        return [self.join_symbols(paths.unrank(l, i)) for l, i in picks]
+
+    def enumerate(self, max_len):
+        """Lists the well-formed strings up to the given length in shortlex
+        order, generating them lazily.
+
+        Arguments:
+            max_len (int): the maximal length of the strings.
+        Returns:
+            generator: well-formed strings, shorter ones first and
+                strings of the same length in alphabetical order.
+        """
+        paths = self.paths(max_len)
+        for length, size in enumerate(paths.sizes()):
+            if size:
+                for word in paths.strings(length):
+                    yield self.join_symbols(word)
+
+    def count(self, max_len):
+        """Counts the well-formed strings up to the given length without
+        listing them.
+
+        Arguments:
+            max_len (int): the maximal length of the strings.
+        Returns:
+            int: the number of well-formed strings.
+        """
+        return sum(self.paths(max_len).sizes())
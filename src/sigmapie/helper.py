@@ -7,6 +7,9 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+import random
+from random import Random
+
 
 def alphabetize(data):
     """Detects symbols used in the input data.
@@ -86,3 +89,61 @@ def remove_from_prefix(w, pref):
         return w
 
     raise ValueError(pref + " is not a prefix of " + w)
+
+
+def make_rng(seed=None, rng=None):
+    """Returns the random generator to be used by a generation method.
+
+    Arguments:
+        seed (int): a seed for a new generator;
+        rng (Random): an existing generator, takes precedence over
+            the seed.
+    Returns:
+        Random: the given generator, a new generator with the given
+            seed, or the `random` module itself if neither is given: it
+            has the same methods, and `random.seed` makes the generation
+            reproducible.
+    """
+    if rng is not None:
+        return rng
+    if seed is not None:
+        return Random(seed)
+    return random
+
+
+def sample_indices(total, n, rng):
+    """Draws n distinct integers from range(total). Unlike `Random.sample`,
+    the total is not limited by the size of a C integer, so indices of
+    strings of very large languages can be drawn.
+
+    Arguments:
+        total (int): the number of integers to choose from;
+        n (int): the number of integers to draw, at most total;
+        rng (Random): the random generator.
+    Returns:
+        list: the drawn integers.
+    """
+    if 2 * n >= total:
+        return rng.sample(range(total), n)
+
+    seen, picks = set(), []
+    while len(picks) < n:
+        i = rng.randrange(total)
+        if i not in seen:
+            seen.add(i)
+            picks.append(i)
+    return picks
+
+
+def spawn_seeds(seed, n):
+    """Derives seeds of independent random streams from a single seed.
+
+    Arguments:
+        seed (int): the master seed; if None, the seeds are drawn from
+            the generator of the `random` module, see `make_rng`;
+        n (int): the number of streams.
+    Returns:
+        list: n seeds.
+    """
+    master = make_rng(seed)
+    return [master.getrandbits(64) for i in range(n)]
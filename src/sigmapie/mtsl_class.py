@@ -8,10 +8,29 @@ option) any later version.
 """
 
 from copy import deepcopy
-from random import choice, randint
+from array import array
+from random import Random
 from itertools import product
+from multiprocessing import Pool
 from sigmapie.tsl_class import *
 from sigmapie.fsm_family import *
+from sigmapie.acceptors import *
+
+
+# path index shared by the worker processes of MTSL.learn
+_tier_worker_state = None
+
+
+def _init_tier_worker(learner, index, bits):
+    """Stores the read-only path index in a worker process."""
+    global _tier_worker_state
+    _tier_worker_state = (learner, index, bits)
+
+
+def _tier_worker(bgr):
+    """Infers the tier of a single bigram inside a worker process."""
+    learner, index, bits = _tier_worker_state
+    return learner.bigram_tier(bgr, index, bits), bgr
 
 
 class MTSL(TSL):
@@ -27,7 +46,9 @@ class MTSL(TSL):
         fsm (FSMFamily): a list of finite state machines that
             corresponds to the grammar;
         tier (list): list of tuples, where every tuple lists elements
-            of some tier.
+            of some tier;
+        acceptor (MTSLAcceptor): compiled acceptor used for scanning,
+            see `L.compile`.
     Learning for k > 2 is not implemented: requires more theoretical work.
     """
 
@@ -43,12 +64,24 @@ class MTSL(TSL):
             )
         self.tier = None
 
-    def learn(self):
+    def learn(self, workers=1, progress=None, timeout=None, cancel=None):
         """
         Learns 2-local MTSL grammar for a given sample. The algorithm 
         currently works only for k=2 and is based on MTSL2IA designed 
         by McMullin, Aksenova and De Santo (2019). We are currently
         working on lifting the locality of the grammar to arbitrary k.
+        Arguments:
+            workers (int): number of processes among which the tiers
+                of the unattested bigrams are distributed; the
+                default value 1 infers them in the current process;
+            progress (callable): receives reports on the processed
+                strings and bigrams, see `Progress`;
+            timeout (float): the time budget in seconds;
+            cancel (callable or Event): stops the learner when it
+                returns True or is set.
+        Raises:
+            Cancelled: if the learner was cancelled or ran out of time;
+                the grammar and the tiers are left as they were.
         Results:
             self.grammar is updated with a grammar of the following shape:
             {(tier_1):[bigrams_for_tier_1],
@@ -63,50 +96,88 @@ class MTSL(TSL):
                 "run `grammar.extract_alphabet`."
             )
 
-        possible = set(self.generate_all_ngrams(self.alphabet, self.k))
-        attested = set()
-        for d in self.data:
-            bigrams = self.ngramize_item(self.annotate_string(d))
-            attested.update(set(bigrams))
-        unattested = list(possible.difference(attested))
+        tracker = make_progress(progress, timeout, cancel)
+        prof = active_profile()
+        with prof.phase("MTSL.learn"):
+            with prof.phase("ngrams"):
+                tracker.phase("bigrams", sized(self.data))
+                possible = set(self.generate_all_ngrams(self.alphabet, self.k))
+                attested = set()
+                for d in tracked(self.data, tracker):
+                    bigrams = self.ngramize_item(self.annotate_string(d))
+                    attested.update(set(bigrams))
+                unattested = list(possible.difference(attested))
+            prof.count("attested", len(attested))
+            prof.count("unattested", len(unattested))
+
+            with prof.phase("paths"):
+                tracker.phase("paths", sized(self.data))
+                index, bits = self.path_index(tracked(self.data, tracker))
+            prof.count("paths", sum(len(i) for i in index.values()))
+
+            with prof.phase("tiers"):
+                tracker.phase("tiers", len(unattested))
+                if workers > 1 and len(unattested) > 1:
+                    learner = MTSL(alphabet=self.alphabet, edges=self.edges)
+                    chunk = len(unattested) // (workers * 4) + 1
+                    initargs = (learner, index, bits)
+                    with Pool(workers, _init_tier_worker, initargs) as pool:
+                        results = pool.imap(_tier_worker, unattested, chunk)
+                        grammar = list(tracked(results, tracker))
+                else:
+                    grammar = [
+                        (self.bigram_tier(bgr, index, bits), bgr)
+                        for bgr in tracked(unattested, tracker)
+                    ]
 
-        paths = self.all_paths(self.data)
-        grammar = []
+            gathered = self.gather_grammars(grammar)
 
-        for bgr in unattested:
-            tier = self.alphabet[:]
+            self.grammar = gathered
+            self.tier = [i for i in self.grammar]
+            prof.count("tiers", len(self.tier))
 
-            for s in self.alphabet:
-                rmv = True
+            if self.check_polarity() == "p":
+                with prof.phase("polarity"):
+                    self.grammar = self.opposite_polarity()
+        tracker.finish()
 
-                # condition 1
-                if s in bgr:
-                    rmv = False
-                    continue
+    def bigram_tier(self, bgr, index, bits):
+        """Finds the tier on which the given unattested bigram is banned.
 
-                # condition 2
-                relevant_paths = []
-                for p in paths:
-                    if (p[0] == bgr[0]) and (p[-1] == bgr[-1]) and (s in p[1]):
-                        relevant_paths.append(p)
-                for rp in relevant_paths:
-                    new = [rp[0], set(i for i in rp[1] if i != s), rp[2]]
-                    if new not in paths:
-                        rmv = False
-                        break
+        A symbol is removed from the tier if it is not a part of the
+        bigram, and if removing it from any path between the symbols
+        of the bigram gives a path that is also attested.
+        Arguments:
+            bgr (tuple): an unattested bigram;
+            index (dict): paths indexed by their first and last
+                symbols, see `path_index`;
+            bits (dict): mapping of symbols to bits used in the index.
+        Returns:
+            list: the symbols of the tier.
+        """
+        tier = self.alphabet[:]
+        relevant = index.get((bgr[0], bgr[-1]), set())
 
-                # remove from the tier if passed both conditions
-                if rmv:
-                    tier.remove(s)
+        for s in self.alphabet:
+            rmv = True
 
-            grammar.append((tier, bgr))
-        gathered = self.gather_grammars(grammar)
+            # condition 1
+            if s in bgr:
+                rmv = False
+                continue
 
-        self.grammar = gathered
-        self.tier = [i for i in self.grammar]
+            # condition 2
+            bit = bits[s]
+            for mask in relevant:
+                if (mask & bit) and (mask & ~bit) not in relevant:
+                    rmv = False
+                    break
+
+            # remove from the tier if passed both conditions
+            if rmv:
+                tier.remove(s)
 
-        if self.check_polarity() == "p":
-            self.grammar = self.opposite_polarity()
+        return tier
 
     def scan(self, string):
         """Scan string with respect to a given MTSL grammar.
@@ -116,24 +187,39 @@ class MTSL(TSL):
         Returns:
             bool: well-formedness of the string.
         """
-        tier_evals = []
-
-        for tier in self.grammar:
-            t = tier
-            g = self.grammar[tier]
-
-            delete_non_tier = "".join([i for i in string if i in t])
-            tier_image = self.annotate_string(delete_non_tier)
-            ngrams = self.ngramize_item((tier_image))
+        return self.get_acceptor().scan(string)
 
-            this_tier = [(ngr in g) for ngr in ngrams]
+    def compile_acceptor(self):
+        """Compiles the grammar into an acceptor with bitset-encoded tiers
+        and integer-packed ngrams.
 
-            if self.check_polarity() == "p":
-                tier_evals.append(all(this_tier))
-            else:
-                tier_evals.append(not any(this_tier))
+        Returns:
+            MTSLAcceptor: the compiled acceptor.
+        """
+        return MTSLAcceptor(
+            self.grammar,
+            self.k,
+            self.edges,
+            self.check_polarity(),
+            symbols=self.symbol_table(),
+            packed=self.packed_grammar(),
+        )
+
+    def packed_grammar(self):
+        """Returns the restrictions of every tier packed into integers, see
+        `SymbolTable.pack`; cached until the grammar changes.
 
-        return all(tier_evals)
+        Returns:
+            dict: the packed restrictions of the form {tier: packed}, see
+                `L.packed_grammar`.
+        """
+        if "packed" not in self._cache:
+            table = self.symbol_table()
+            self._cache["packed"] = {
+                tier: table.pack_all(restrictions)
+                for tier, restrictions in (self.grammar or {}).items()
+            }
+        return self._cache["packed"]
 
     def gather_grammars(self, grammar):
         """Gathers grammars with the same tier together.
@@ -154,6 +240,67 @@ class MTSL(TSL):
                 G[tuple(i[0])] = [i[1]]
         return G
 
+    def symbol_bits(self):
+        """Assigns a distinct bit to every symbol of the alphabet and to
+        the edge symbols.
+
+        Returns:
+            dict: a dictionary mapping symbols to integer bitmasks.
+        """
+        symbols = list(self.alphabet or [])
+        symbols += [e for e in self.edges if e not in symbols]
+        return {s: 1 << i for i, s in enumerate(symbols)}
+
+    def path_masks(self, string, bits=None):
+        """Collects distinct paths of a string, encoding the set of
+        in-between symbols of every path as a bitmask.
+
+        For every position `i`, the set of in-between symbols only grows
+        when a symbol occurs for the first time after `i`, so it changes
+        at most |alphabet| times. Between two such points every following
+        symbol is already in the set, and only the distinct ones need to
+        be emitted; they are read off a table of next occurrences.
+        Arguments:
+            string (str): a string paths of which need to be found;
+            bits (dict): mapping of symbols to bits, see `symbol_bits`;
+                symbols missing from it are added to it.
+        Returns:
+            set: triples (a, X, b), where X is the bitmask of the
+                symbols in-between `a` and `b`.
+        """
+        if bits is None:
+            bits = self.symbol_bits()
+        string = self.annotate_string(string)
+        for s in string:
+            if s not in bits:
+                bits[s] = 1 << len(bits)
+
+        # nxt[j] maps every symbol to its first occurrence at or after j
+        n = len(string)
+        nxt = [None] * (n + 1)
+        nxt[n] = {}
+        for j in range(n - 1, -1, -1):
+            nxt[j] = dict(nxt[j + 1])
+            nxt[j][string[j]] = j
+
+        paths = set()
+        for i in range(n - 1):
+            a = string[i]
+            firsts = sorted(nxt[i + 1].values())
+            mask, seen = 0, []
+            for m, p in enumerate(firsts):
+                paths.add((a, mask, string[p]))
+                mask |= bits[string[p]]
+                seen.append(string[p])
+
+                end = firsts[m + 1] if m + 1 < len(firsts) else n
+                after = nxt[p + 1]
+                for c in seen:
+                    if after.get(c, n) < end:
+                        paths.add((a, mask, c))
+
+        return paths
+
     def path(self, string):
         """Collects a list of paths from a string.
 
@@ -166,19 +313,39 @@ class MTSL(TSL):
         Returns:
             list: list of paths of `string`.
         """
-        string = self.annotate_string(string)
-        paths = []
+        bits = self.symbol_bits()
+        masks = self.path_masks(string, bits)
+        return [[a, self.unmask(x, bits), b] for a, x, b in masks]
+
+    def unmask(self, mask, bits):
+        """Decodes a bitmask into the set of symbols it encodes.
 
-        for i in range(len(string) - 1):
-            for j in range(i + 1, len(string)):
-                path = [string[i]]
-                path.append(set(k for k in string[(i + 1) : j]))
-                path.append(string[j])
+        Arguments:
+            mask (int): a bitmask of symbols;
+            bits (dict): mapping of symbols to bits.
+        Returns:
+            set: the symbols encoded in the mask.
+        """
+        return {s for s, b in bits.items() if mask & b}
 
-                if path not in paths:
-                    paths.append(path)
+    def path_index(self, dataset):
+        """Collects the paths of a list of strings, indexed by their
+        first and last symbols.
 
-        return paths
+        Arguments:
+            dataset (list): a list of strings.
+        Returns:
+            (dict, dict)
+                dict: {(a, b): set of bitmasks X} for all paths <a, X, b>;
+                dict: mapping of symbols to bits used in the masks.
+        """
+        bits = self.symbol_bits()
+        index = {}
+        for item in dataset:
+            for a, x, b in self.path_masks(item, bits):
+                index.setdefault((a, b), set()).add(x)
+
+        return index, bits
 
     def all_paths(self, dataset):
         """Finds all paths that are present in a list of strings.
@@ -188,13 +355,12 @@ class MTSL(TSL):
         Returns:
             list: a list of paths present in `dataset`.
         """
-        paths = []
-        for item in dataset:
-            for p in self.path(item):
-                if p not in paths:
-                    paths.append(p)
-
-        return paths
+        index, bits = self.path_index(dataset)
+        return [
+            [a, self.unmask(x, bits), b]
+            for (a, b), masks in index.items()
+            for x in masks
+        ]
 
     def opposite_polarity(self):
         """Generates a grammar of the opposite polarity.
@@ -215,6 +381,76 @@ class MTSL(TSL):
 
         return opposite
 
+    def restore(self, header, sections):
+        """Restores the grammar from its description, see `dump`."""
+        super().restore(header, sections)
+        self.fsm = FSMFamily()
+        if self.tier is not None:
+            self.tier = [tuple(i) for i in self.tier]
+
+    def encode_grammar(self, table, header):
+        """Encodes the restrictions of all tiers as a single array of symbol
+        codes; the tiers and the numbers of their restrictions are stored
+        in the header.
+
+        Arguments:
+            table (SymbolTable): the encoding of the symbols;
+            header (dict): the header of the saved grammar.
+        Returns:
+            array: the codes, see `encode_ngrams`.
+        """
+        grammar = self.grammar or {}
+        header["tiers"] = [list(tier) for tier in grammar]
+        header["sizes"] = [len(r) for r in grammar.values()]
+        ngrams = [n for r in grammar.values() for n in r]
+        return encode_ngrams(table, ngrams, self.k)
+
+    def encode_packed(self, table):
+        """Packs the restrictions of every tier into a sorted run of a
+        single array; the sizes of the runs are stored in the header, see
+        `encode_grammar`.
+
+        Arguments:
+            table (SymbolTable): the encoding of the symbols.
+        Returns:
+            array: the sorted packed restrictions of the tiers in a row.
+        """
+        packed = array("Q")
+        for restrictions in (self.grammar or {}).values():
+            packed.extend(sorted(table.pack_all(restrictions)))
+        return packed
+
+    def map_packed(self, header, packed):
+        """Caches the packed restrictions of every tier in a memory-mapped
+        file, see `encode_packed`.
+
+        Arguments:
+            header (dict): the header of the saved grammar;
+            packed (memoryview): the sorted packed restrictions.
+        """
+        self._cache["symbols"] = SymbolTable(header["symbols"])
+        runs, start = {}, 0
+        for tier, size in zip(header["tiers"], header["sizes"]):
+            runs[tuple(tier)] = PackedNgrams(packed[start : start + size])
+            start += size
+        self._cache["packed"] = runs
+
+    def decode_grammar(self, header, codes):
+        """Decodes the restrictions of the tiers, see `encode_grammar`.
+
+        Arguments:
+            header (dict): the header of the saved grammar;
+            codes (array): the codes of the symbols of the restrictions.
+        Returns:
+            dict: the grammar of the form {tier: [restrictions]}.
+        """
+        ngrams = decode_ngrams(header["symbols"], codes, self.k)
+        grammar, start = {}, 0
+        for tier, size in zip(header["tiers"], header["sizes"]):
+            grammar[tuple(tier)] = ngrams[start : start + size]
+            start += size
+        return grammar
+
     def switch_polarity(self):
         """Changes polarity of the grammar, and rewrites grammar to the
         opposite one."""
@@ -235,6 +471,8 @@ class MTSL(TSL):
         """
         if not self.grammar:
             raise (IndexError("The grammar must not be empty."))
+        if "restrictions" in self._cache:
+            return self._cache["restrictions"]
 
         restr_to_fsm = []
 
@@ -255,6 +493,7 @@ class MTSL(TSL):
             tsl.fsmize()
             restr_to_fsm.append([tsl.tier[:], tsl.grammar[:], tsl.fsm])
 
+        self._cache["restrictions"] = restr_to_fsm
         return restr_to_fsm
 
     def fsmize(self):
@@ -263,7 +502,16 @@ class MTSL(TSL):
         restr_to_fsm = self.map_restrictions_to_fsms()
         self.fsm.family = [i[2] for i in restr_to_fsm]
 
-    def generate_sample(self, n=10, repeat=True, safe=True):
+    def generate_sample(
+        self,
+        n=10,
+        repeat=True,
+        safe=True,
+        seed=None,
+        max_len=None,
+        by_length=False,
+        workers=1,
+    ):
         """Generates a data sample of the required size, with or without
         repetitions depending on `repeat` value.
 
@@ -271,52 +519,54 @@ class MTSL(TSL):
             n (int): the number of examples to be generated;
             repeat (bool): allows (rep=True) or prohibits (rep=False)
                repetitions within the list of generated items;
-            safe (bool): automatically breaks out of infinite loops,
-                for example, when the grammar cannot generate the
-                required number of data items, and the repetitions
-                are set to False.
+            safe (bool): if the grammar cannot generate the required
+                number of data items and the repetitions are set to
+                False, returns all the strings it can generate instead
+                of raising a ValueError;
+            seed (int): seed of the random generator; the sample is
+                generated in chunks with streams derived from it, see
+                `seeded_chunks`;
+            max_len (int): without repetitions, draws the strings
+                uniformly among the strings up to this length, see
+                `generate_unique`; if not given, random strings are
+                generated until n distinct ones are found, as with
+                repetitions, see `sample_distinct`;
+            by_length (bool): with max_len, chooses the length of every
+                string uniformly, see `generate_unique`;
+            workers (int): number of processes among which the chunks
+                of the sample are distributed, see `map_chunks`.
         Returns:
             list: generated data sample.
         """
         if not self.alphabet:
             raise ValueError("Alphabet cannot be empty.")
-        if not self.fsm.family:
-            self.fsmize()
-
-        tier_smap = self.tier_state_maps()
-        if not any([len(tier_smap[x]) for x in tier_smap]):
-            raise (
-                ValueError(
-                    "There are ngrams in the grammar that are"
-                    " not leading anywhere. Clean the grammar "
-                    " or run `grammar.clean_grammar()`."
-                )
-            )
-
-        data = [self.generate_item(tier_smap) for i in range(n)]
 
+        automaton = self.product_automaton()
         if not repeat:
-            data = set(data)
-            useless_loops = 0
-            prev_len = len(data)
+            rng = make_rng(seed)
+            if max_len is None:
+                draw = lambda: self.generate_item(automaton, rng)
+                return self.sample_distinct(n, draw, safe)
+            return self.generate_unique(
+                n, self.paths(max_len), by_length, safe, rng, workers
+            )
 
-            while len(data) < n:
-                data.add(self.generate_item(tier_smap))
+        chunks = self.seeded_chunks(n, seed)
+        return self.map_chunks("generate_chunk", (automaton,), chunks, workers)
 
-                if prev_len == len(data):
-                    useless_loops += 1
-                else:
-                    useless_loops = 0
-
-                if safe and useless_loops > 500:
-                    print(
-                        "The grammar cannot produce the requested "
-                        "number of strings. Check the grammar, "
-                        "reduce the number, or allow repetitions."
-                    )
-                    break
+    def generate_chunk(self, automaton, size, seed):
+        """Generates a chunk of the sample with its own random stream.
 
-        return list(data)
+        Arguments:
+            automaton (dict): the product automaton of the grammar,
+                see `product_automaton`;
+            size (int): the number of strings to be generated;
+            seed (int): the seed of the chunk, see `seeded_chunks`.
+        Returns:
+            list: generated strings.
+        """
+        rng = Random(seed)
+        return [self.generate_item(automaton, rng) for i in range(size)]
 
     def tier_image(self, string):
         """
@@ -331,40 +581,71 @@ class MTSL(TSL):
         """
         tiers = {}
         for i in self.grammar:
-            curr_tier = ""
-            for s in string:
-                if s in self.edges or s in i:
-                    curr_tier += s
-            tiers[i] = curr_tier
+            curr_tier = [s for s in string if s in self.edges or s in i]
+            if isinstance(string, str):
+                tiers[i] = "".join(curr_tier)
+            else:
+                tiers[i] = tuple(curr_tier)
         return tiers
 
-    def generate_item(self, tier_smap):
-        """Generates a well-formed string with respect to the given grammar.
+    def generate_item(self, automaton=None, rng=None):
+        """Generates a well-formed string with respect to the given grammar
+        by a random walk through the product automaton: every step is
+        chosen among the valid ones, so no string is rejected.
 
+        Arguments:
+            automaton (dict): the product automaton of the grammar,
+                see `product_automaton`;
+            rng (Random): the random generator, see `make_rng`.
         Returns:
             str: a well-formed string.
         """
-        word = self.edges[0] * (self.k - 1)
-        main_smap = self.general_state_map(tier_smap)
-        tier_images = self.tier_image(word)
-
-        while word[-1] != self.edges[1]:
-            maybe = choice(main_smap[word[-(self.k - 1) :]])
-            good = True
-            for tier in tier_smap:
-                if maybe in tier:
-                    old_image = tier_images[tier]
-                    if maybe not in tier_smap[tier][old_image[-(self.k - 1) :]]:
-                        good = False
-            if good:
-                word += maybe
-                tier_images = self.tier_image(word)
-
-        newword = word[(self.k - 1) : -1]
-        if self.scan(newword):
-            return newword
-        else:
-            return self.generate_item(tier_smap)
+        if automaton is None:
+            automaton = self.product_automaton()
+        rng = make_rng(rng=rng)
+
+        state = self.get_acceptor().initial_state()
+        word = []
+        while True:
+            symbol, state = rng.choice(automaton[state])
+            if state is None:
+                return self.join_symbols(word)
+            word.append(symbol)
+
+    def product_automaton(self):
+        """Builds the product automaton of the tier automata of the grammar,
+        pruned to the states from which the end of the string can be
+        reached.
+
+        Returns:
+            dict: {state: [(symbol, next_state), ...]}, where the end of
+                the string is represented by the next state None.
+        """
+        acceptor = self.get_acceptor()
+        if "automaton" in self._cache:
+            return self._cache["automaton"]
+
+        automaton = acceptor.product(self.alphabet)
+        if acceptor.initial_state() not in automaton:
+            raise ValueError(
+                "The grammar does not generate any strings. "
+                "Check the grammar or the alphabet."
+            )
+
+        self._cache["automaton"] = automaton
+        return automaton
+
+    def acceptor_table(self):
+        """Encodes the product automaton of the grammar as a table of
+        integer states.
+
+        Returns:
+            list: the encoded states, see `L.acceptor_table`.
+        """
+        acceptor = self.get_acceptor()
+        if "table" not in self._cache:
+            self._cache["table"] = acceptor.table(self.alphabet)
+        return self._cache["table"]
 
     def tier_state_maps(self):
         """
@@ -380,9 +661,11 @@ class MTSL(TSL):
                 }, where keys are (k-1)-long tier representations.
         Warning: the list of next symbols is tier-specific,
             so this estimates the rough options: refer to
-            generate_item for the filtering of wrongly
-            generated items.
+            product_automaton for the exact transitions.
         """
+        if "tier_smaps" in self._cache:
+            return self._cache["tier_smaps"]
+
         restr_to_fsm = self.map_restrictions_to_fsms()
         tier_smaps = {}
 
@@ -396,21 +679,32 @@ class MTSL(TSL):
             sl.fsm = curr_tier[2]
             tier_smaps[tuple(sl.alphabet)] = sl.state_map()
 
+        self._cache["tier_smaps"] = tier_smaps
         return tier_smaps
 
-    def general_state_map(self, smaps):
+    def general_state_map(self, smaps=None):
         """
         Generates a dictionary of transitions within all
         FSMs of the FSM family.
+        Arguments:
+            smaps (dict): tier state maps; if not given, the cached
+                result of `tier_state_maps` is used, and the general
+                state map is cached as well.
         Returns:
             dict: the dictionary of the form
                 {"keys":[list of next symbols]}, where 
                 keys are (k-1)-long strings.
         Warning: the list of next symbols is tier-specific,
             so this estimates the rough options: refer to
-            generate_item for the filtering of wrongly
-            generated items.
+            product_automaton for the exact transitions.
         """
+        if smaps is None:
+            if "main_smap" not in self._cache:
+                self._cache["main_smap"] = self.general_state_map(
+                    self.tier_state_maps()
+                )
+            return self._cache["main_smap"]
+
         local_smaps = deepcopy(smaps)
 
         for tier in local_smaps:
@@ -439,7 +733,7 @@ class MTSL(TSL):
 
         ext_alphabet = deepcopy(self.alphabet) + [self.edges[1]]
         for x in free_ones:
-            main_smap[x] = ext_alphabet
+            main_smap["".join((x,) * (self.k - 1))] = ext_alphabet
 
         return main_smap
 
@@ -461,3 +755,4 @@ class MTSL(TSL):
             sl.fsmize()
             sl.clean_grammar()
             self.grammar[tier] = deepcopy(sl.grammar)
+        self.clear_cache()
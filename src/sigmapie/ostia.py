@@ -9,63 +9,110 @@ option) any later version.
 
 from sigmapie.fst_object import *
 from sigmapie.helper import *
+from sigmapie.symbols import *
+from sigmapie.profiling import *
+from sigmapie.progress import *
 
 
-def ostia(S, Sigma, Gamma):
+def ostia(S, Sigma, Gamma, progress=None, timeout=None, cancel=None):
     """This function implements OSTIA (Onward Subsequential Transduction
     Inference Algorithm).
 
     Arguments:
         S (list): a list of pairs (o, t), where `o` is the original
-            string, and `t` is its translation;
+            string, and `t` is its translation; if the alphabets
+            contain multi-character segments, `o` and `t` can also be
+            tuples of segments;
         Sigma (list): the input alphabet;
-        Gamma (list): the output alphabet.
+        Gamma (list): the output alphabet;
+        progress (callable): receives reports on the processed states
+            of the prefix tree, see `Progress`; the total is the size
+            of the tree, an upper bound of the number of steps;
+        timeout (float): the time budget in seconds;
+        cancel (callable or Event): stops the learner when it returns
+            True or is set.
     Returns:
         FST: a transducer defining the mapping.
+    Raises:
+        Cancelled: if the learner was cancelled or ran out of time.
     """
-    # create a template of the onward PTT
-    T = build_ptt(S, Sigma, Gamma)
-    T = onward_ptt(T, "", "")[0]
-
-    # color the nodes
-    red = [""]
-    blue = [tr[3] for tr in T.E if tr[0] == "" and len(tr[1]) == 1]
-
-    # choose a blue state
-    while len(blue) != 0:
-        blue_state = blue[0]
-
-        # if exists state that we can merge with, do it
-        exists = False
-        for red_state in red:
-
-            # if you already merged that blue state with something, stop
-            if exists == True:
-                break
-
-            # try to merge these two states
-            if ostia_merge(T, red_state, blue_state):
-                T = ostia_merge(T, red_state, blue_state)
-                exists = True
-
-        # if it is not possible, color that blue state red
-        if not exists:
-            red.append(blue_state)
-
-        # if possible, remove the folded state from the list of states
-        else:
-            T.Q.remove(blue_state)
-            del T.stout[blue_state]
-
-        # add in blue list other states accessible from the red ones that are not red
-        blue = []
-        for tr in T.E:
-            if tr[0] in red and tr[3] not in red:
-                blue.append(tr[3])
-
-    # clean the transducer from non-reachable states
-    T = ostia_clean(T)
+    # write the ids of multi-character segments as single characters
+    segments = None
+    if any(not isinstance(s, str) or len(s) != 1 for s in list(Sigma) + list(Gamma)):
+        if max(len(Sigma), len(Gamma)) > PRIVATE_USE_SIZE:
+            raise ValueError("The alphabets cannot exceed 6400 segments.")
+        segments = (Tokenizer(Sigma), Tokenizer(Gamma))
+        S = [
+            (ids_to_text(segments[0].encode(o)), ids_to_text(segments[1].encode(t)))
+            for o, t in S
+        ]
+        Sigma = [ids_to_text(segments[0].encode((s,))) for s in Sigma]
+        Gamma = [ids_to_text(segments[1].encode((s,))) for s in Gamma]
+
+    tracker = make_progress(progress, timeout, cancel)
+    prof = active_profile()
+    with prof.phase("ostia"):
+        # create a template of the onward PTT
+        with prof.phase("ptt"):
+            tracker.phase("ptt")
+            T = build_ptt(S, Sigma, Gamma)
+        prof.count("ptt states", len(T.Q))
+        with prof.phase("onward"):
+            tracker.phase("onward")
+            T = onward_ptt(T, "", "")[0]
+
+        # color the nodes
+        red = [""]
+        blue = [tr[3] for tr in T.E if tr[0] == "" and len(tr[1]) == 1]
+
+        # choose a blue state
+        with prof.phase("merge"):
+            tracker.phase("merge", len(T.Q))
+            while len(blue) != 0:
+                blue_state = blue[0]
+                prof.peak("blue states", len(blue))
+                tracker.advance()
+
+                # if exists state that we can merge with, do it
+                exists = False
+                for red_state in red:
+
+                    # if you already merged that blue state with something, stop
+                    if exists == True:
+                        break
+
+                    # try to merge these two states
+                    prof.count("merges tried")
+                    tracker.check()
+                    if ostia_merge(T, red_state, blue_state):
+                        T = ostia_merge(T, red_state, blue_state)
+                        exists = True
+                        prof.count("merges accepted")
+
+                # if it is not possible, color that blue state red
+                if not exists:
+                    red.append(blue_state)
+
+                # if possible, remove the folded state from the list of states
+                else:
+                    T.Q.remove(blue_state)
+                    del T.stout[blue_state]
+
+                # add in blue list other states accessible from the red ones
+                blue = []
+                for tr in T.E:
+                    if tr[0] in red and tr[3] not in red:
+                        blue.append(tr[3])
+
+        # clean the transducer from non-reachable states
+        with prof.phase("clean"):
+            tracker.phase("clean")
+            T = ostia_clean(T)
+        prof.count("states", len(T.Q))
+        prof.count("transitions", len(T.E))
     T.E = [tuple(i) for i in T.E]
+    T.segments = segments
+    tracker.finish()
 
     return T
 
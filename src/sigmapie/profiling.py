@@ -0,0 +1,182 @@
+"""Instrumentation of the learners of the subregular package. Copyright (C)
+2019  Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # Python 3.6
+
+    class ContextVar(object):
+        """Stands for `contextvars.ContextVar` before Python 3.7: the
+        value is kept per thread."""
+
+        def __init__(self, name, default=None):
+            """Initializes the variable."""
+            self.name = name
+            self.default = default
+            self.local = threading.local()
+
+        def get(self):
+            """Returns the value of the variable in the current thread."""
+            return getattr(self.local, "value", self.default)
+
+        def set(self, value):
+            """Sets the value and returns the previous one as the token."""
+            token = self.get()
+            self.local.value = value
+            return token
+
+        def reset(self, token):
+            """Restores the value preceding the `set` returning the token."""
+            self.local.value = token
+
+# profile that receives the measurements of the learners running in the
+# current context, so that threads and asyncio tasks are profiled apart
+_active_profile = ContextVar("active_profile", default=None)
+
+# the profile and the names of the phases open in the current context
+_open_phases = ContextVar("open_phases", default=(None, ()))
+
+
+class Profile(object):
+    """Measurements of a computation: the wall time of its phases, counts
+    of the processed items and peak sizes of its structures.
+
+    Phases started inside other phases are named by the path of the
+    phases, as in "TSL.learn/tier"; the times of repeated phases are
+    summed. Counters and sizes are named by the path of the phase in
+    which they are recorded, as in "TSL.learn/tier/strings". The open
+    phases are tracked per context: phases of a profile shared by threads
+    or asyncio tasks do not nest into each other.
+    Attributes:
+        phases (dict): wall time of the phases in seconds;
+        counts (dict): counters, such as the number of extracted ngrams
+            or of the tried merges;
+        peaks (dict): the largest recorded sizes of the structures;
+        logger (Logger): if given, every finished phase is logged at
+            the DEBUG level.
+    """
+
+    def __init__(self, logger=None):
+        """Initializes the Profile object."""
+        self.phases = {}
+        self.counts = {}
+        self.peaks = {}
+        self.logger = logger
+
+    @property
+    def stack(self):
+        """list: names of the phases open in the current context."""
+        owner, names = _open_phases.get()
+        return list(names) if owner is self else []
+
+    @contextmanager
+    def phase(self, name):
+        """Measures the wall time of the code inside the `with` block.
+
+        Arguments:
+            name (str): the name of the phase.
+        """
+        names = tuple(self.stack) + (name,)
+        token = _open_phases.set((self, names))
+        path = "/".join(names)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _open_phases.reset(token)
+            self.phases[path] = self.phases.get(path, 0.0) + elapsed
+            if self.logger is not None:
+                self.logger.debug("%s: %.6f s", path, elapsed)
+
+    def count(self, name, n=1):
+        """Increases the counter of the given name by n."""
+        path = "/".join(self.stack + [name])
+        self.counts[path] = self.counts.get(path, 0) + n
+
+    def peak(self, name, size):
+        """Records the size of a structure, keeping the largest one."""
+        path = "/".join(self.stack + [name])
+        if size > self.peaks.get(path, -1):
+            self.peaks[path] = size
+
+    def as_dict(self):
+        """Returns the measurements as a dictionary of the form
+        {"phases": {...}, "counts": {...}, "peaks": {...}}."""
+        return {
+            "phases": dict(self.phases),
+            "counts": dict(self.counts),
+            "peaks": dict(self.peaks),
+        }
+
+    def log(self, logger=None, level=logging.INFO):
+        """Logs all measurements as a single record.
+
+        Arguments:
+            logger (Logger): the logger, `self.logger` or the logger of
+                the package by default;
+            level (int): the level of the record.
+        """
+        logger = logger or self.logger or logging.getLogger("sigmapie")
+        logger.log(level, "profile: %s", self.as_dict())
+
+
+class _NoProfile(object):
+    """Stands for the profile when nothing is profiled: every record is
+    ignored."""
+
+    @contextmanager
+    def phase(self, name):
+        """Runs the code of the phase without measuring it."""
+        yield
+
+    def count(self, name, n=1):
+        """Ignores the counter."""
+
+    def peak(self, name, size):
+        """Ignores the size."""
+
+
+_no_profile = _NoProfile()
+
+
+@contextmanager
+def profile(logger=None):
+    """Profiles the learners called inside the `with` block:
+
+        with profile() as p:
+            grammar.learn()
+        print(p.as_dict())
+
+    Only the learners running in the context of the block are profiled:
+    not those in other threads, in asyncio tasks started outside of the
+    block, or in worker processes.
+    Arguments:
+        logger (Logger): if given, the finished phases are logged.
+    Yields:
+        Profile: the measurements.
+    """
+    p = Profile(logger)
+    token = _active_profile.set(p)
+    try:
+        yield p
+    finally:
+        _active_profile.reset(token)
+
+
+def active_profile():
+    """Returns the profile of the enclosing `profile` block, or an object
+    that ignores the measurements outside of such a block."""
+    p = _active_profile.get()
+    return _no_profile if p is None else p
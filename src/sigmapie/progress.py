@@ -0,0 +1,172 @@
+"""Progress reporting and cancellation of long-running learners. Copyright
+(C) 2019  Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import time
+
+
+class Cancelled(Exception):
+    """Raised by a learner that was cancelled or ran out of its time
+    budget; the grammar keeps the state it had before the learner was
+    called."""
+
+
+class Progress(object):
+    """Tracks the progress of a learner: reports the processed items of
+    its current phase to a callback, and stops the learner when it is
+    cancelled or exceeds its time budget.
+
+    The callback receives a dictionary with the keys "phase" (str),
+    "done" (int), "total" (int, or None if unknown), "elapsed" (seconds
+    since the start of the learner) and "eta" (estimated seconds until
+    the end of the phase, or None if unknown). It is called when a phase
+    starts and ends, and at most every `interval` seconds in-between.
+    Attributes:
+        callback (callable): the receiver of the reports;
+        timeout (float): the time budget in seconds;
+        cancel (callable or Event): tells if the learner has to stop:
+            a function without arguments, or an object with the method
+            `is_set`, such as `threading.Event`;
+        interval (float): the minimal number of seconds between two
+            reports within a phase.
+    """
+
+    def __init__(self, callback=None, timeout=None, cancel=None, interval=0.5):
+        """Initializes the Progress object."""
+        self.callback = callback
+        self.timeout = timeout
+        self.cancel = getattr(cancel, "is_set", cancel)
+        self.interval = interval
+        self.start = time.monotonic()
+        self.name, self.total, self.done = None, None, 0
+        self.phase_start = self.last_report = self.start
+
+    def phase(self, name, total=None):
+        """Starts a new phase of the learner.
+
+        Arguments:
+            name (str): the name of the phase;
+            total (int): the number of items of the phase, if known.
+        """
+        if self.name is not None:
+            self.report()
+        self.name, self.total, self.done = name, total, 0
+        self.phase_start = time.monotonic()
+        self.check()
+        self.report()
+
+    def advance(self, n=1):
+        """Marks n more items of the current phase as processed, and stops
+        the learner if it was cancelled or ran out of time."""
+        self.done += n
+        now = self.check()
+        if self.callback is not None and now - self.last_report >= self.interval:
+            self.report(now)
+
+    def finish(self):
+        """Reports the end of the last phase."""
+        if self.name is not None:
+            self.report()
+            self.name = None
+
+    def check(self):
+        """Raises Cancelled if the learner has to stop.
+
+        Returns:
+            float: the current time, see `time.monotonic`.
+        """
+        now = time.monotonic()
+        if self.cancel is not None and self.cancel():
+            raise Cancelled("The learner was cancelled.")
+        if self.timeout is not None and now - self.start > self.timeout:
+            raise Cancelled(
+                "The learner exceeded its time budget of "
+                + str(self.timeout)
+                + " seconds."
+            )
+        return now
+
+    def report(self, now=None):
+        """Sends the state of the current phase to the callback."""
+        if self.callback is None:
+            return
+        now = time.monotonic() if now is None else now
+        eta = None
+        if self.total is not None and self.done:
+            rate = (now - self.phase_start) / self.done
+            eta = max(0, self.total - self.done) * rate
+        self.last_report = now
+        self.callback(
+            {
+                "phase": self.name,
+                "done": self.done,
+                "total": self.total,
+                "elapsed": now - self.start,
+                "eta": eta,
+            }
+        )
+
+
+class _NoProgress(object):
+    """Stands for the progress tracker of a learner that is neither
+    reported nor cancellable."""
+
+    def phase(self, name, total=None):
+        """Ignores the phase."""
+
+    def advance(self, n=1):
+        """Ignores the processed items."""
+
+    def finish(self):
+        """Ignores the end of the learner."""
+
+    def check(self):
+        """Never stops the learner."""
+
+
+_no_progress = _NoProgress()
+
+
+def make_progress(progress=None, timeout=None, cancel=None):
+    """Returns the progress tracker of a learner.
+
+    Arguments:
+        progress (callable or Progress): the callback receiving the
+            reports, or a configured tracker, see `Progress`;
+        timeout (float): the time budget of the learner in seconds;
+        cancel (callable or Event): tells if the learner has to stop.
+    Returns:
+        Progress: the tracker, or an object that ignores the progress
+            if neither reporting nor cancellation is requested.
+    """
+    if isinstance(progress, (Progress, _NoProgress)):
+        return progress
+    if progress is None and timeout is None and cancel is None:
+        return _no_progress
+    return Progress(progress, timeout, cancel)
+
+
+def sized(data):
+    """Returns the number of items of the data, or None if it is unknown,
+    as for a generator or a corpus streamed from a file."""
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+
+def tracked(items, tracker):
+    """Iterates over the items, marking every one of them as processed.
+
+    Arguments:
+        items (iterable): the items of the current phase;
+        tracker (Progress): the progress tracker, see `make_progress`.
+    """
+    for item in items:
+        yield item
+        tracker.advance()
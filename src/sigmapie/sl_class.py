@@ -6,9 +6,15 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
-from random import choice
+from math import log
+from random import Random
+from array import array
+from collections import Counter
 from sigmapie.helper import *
 from sigmapie.fsm import *
+from sigmapie.acceptors import *
+from sigmapie.profiling import *
+from sigmapie.progress import *
 from sigmapie.grammar import *
 
 
@@ -22,7 +28,10 @@ class SL(L):
         data (list): input data;
         edges (list): start- and end-symbols for the grammar;
         polar ("p" or "n"): polarity of the grammar;
-        fsm (FSM): corresponding finite state machine.
+        fsm (FSM): corresponding finite state machine, rebuilt when
+            the grammar changes, see `get_fsm`;
+        counts (Counter): frequencies of the ngrams in the data, if
+            collected by `learn`.
     """
 
     def __init__(
@@ -31,50 +40,134 @@ class SL(L):
         """Initializes the SL object."""
         super().__init__(alphabet, grammar, k, data, edges, polar)
         self.fsm = FSM(initial=self.edges[0], final=self.edges[1])
+        self.counts = None
 
-    def learn(self):
-        """Extracts SL grammar from the given data."""
-        self.grammar = self.ngramize_data()
-        if self.check_polarity() == "n":
-            self.grammar = self.opposite_polarity(self.alphabet)
+    def learn(self, counts=False):
+        """Extracts SL grammar from the given data.
 
-    def annotate_string(self, string):
+        Arguments:
+            counts (bool): also collects the frequencies of the ngrams
+                in the same pass over the data, see `ngramize_data`.
+        """
+        prof = active_profile()
+        with prof.phase(type(self).__name__ + ".learn"):
+            frequencies = Counter() if counts else None
+            with prof.phase("ngrams"):
+                self.grammar = self.ngramize_data(frequencies)
+            if self.check_polarity() == "n":
+                with prof.phase("polarity"):
+                    self.grammar = self.opposite_polarity(self.alphabet)
+            if counts:
+                self.counts = frequencies
+            prof.count("grammar", len(self.grammar))
+
+    def annotate_string(self, string, k=None):
         """Annotates the string with the start and end symbols.
 
         Arguments:
-            string (str): a string that needs to be annotated.
+            string (str or tuple): a string or a tuple of symbols that
+                needs to be annotated;
+            k (int): the locality window, self.k by default.
         Returns:
-            str: annotated version of the string.
+            str or tuple: annotated version of the string; a tuple of
+                symbols if the string is a tuple, or if an edge symbol
+                is longer than one character.
         """
-        return ">" * (self.k - 1) + string.strip() + "<" * (self.k - 1)
-
-    def ngramize_data(self):
-        """Creates set of n-grams based on the given data.
+        k = self.k if k is None else k
+        start, end = self.edges
+        if isinstance(string, str):
+            if len(start) == 1 and len(end) == 1:
+                return start * (k - 1) + string.strip() + end * (k - 1)
+            string = string.strip()
+        return (start,) * (k - 1) + tuple(string) + (end,) * (k - 1)
+
+    def ngramize_data(self, counts=None):
+        """Creates set of n-grams based on the given data in a single pass
+        over it; if the alphabet is not provided, it is collected in the
+        same pass.
 
+        Arguments:
+            counts (Counter): if given, the occurrences of the ngrams
+                are counted into it in the same pass.
         Returns:
             list: collection of ngrams in the data.
         """
         if not self.data:
             raise ValueError("The data is not provided.")
 
-        ngrams = []
+        ngrams, symbols, strings = set(), set(), 0
         for s in self.data:
+            symbols.update(s)
             item = self.annotate_string(s)
-            ngrams.extend(self.ngramize_item(item))
+            if counts is None:
+                ngrams.update(self.ngramize_item(item))
+            else:
+                windows = [
+                    tuple(item[i : (i + self.k)])
+                    for i in range(len(item) - (self.k - 1))
+                ]
+                counts.update(windows)
+                ngrams.update(windows)
+            strings += 1
+
+        prof = active_profile()
+        prof.count("strings", strings)
+        prof.count("ngrams", len(ngrams))
 
-        return list(set(ngrams))
+        if not self.alphabet:
+            self.alphabet = sorted(symbols - set(self.edges))
+        return list(ngrams)
+
+    def log_probability(self, string, smoothing=0):
+        """Computes the log-probability of the string under the ngram model
+        estimated from the frequencies collected by `learn`: every symbol
+        is predicted by the k-1 preceding ones.
 
-    def ngramize_item(self, item):
+        Arguments:
+            string (str): the string that needs to be evaluated;
+            smoothing (float): the pseudo-count added to every ngram.
+        Returns:
+            float: the natural logarithm of the probability of the
+                string, or -inf if the string contains an ngram with
+                the probability 0.
+        """
+        if self.counts is None:
+            raise ValueError(
+                "The ngram frequencies are not collected. "
+                "Run `grammar.learn(counts=True)`."
+            )
+        if "contexts" not in self._cache:
+            contexts = Counter()
+            for ngram, count in self.counts.items():
+                contexts[ngram[:-1]] += count
+            self._cache["contexts"] = contexts
+        contexts = self._cache["contexts"]
+        options = len(self.alphabet) + 1
+
+        item = self.annotate_string(string)
+        score = 0.0
+        for i in range(len(item) - (self.k - 1)):
+            ngram = tuple(item[i : (i + self.k)])
+            count = self.counts[ngram] + smoothing
+            if not count:
+                return float("-inf")
+            score += log(count / (contexts[ngram[:-1]] + smoothing * options))
+
+        return score
+
+    def ngramize_item(self, item, k=None):
         """This function n-gramizes a given string.
 
         Arguments:
-            item (str): a string that needs to be ngramized.
+            item (str): a string that needs to be ngramized;
+            k (int): the length of the ngrams, self.k by default.
         Returns:
             list: list of ngrams from the item.
         """
+        k = self.k if k is None else k
         ng = []
-        for i in range(len(item) - (self.k - 1)):
-            ng.append(tuple(item[i : (i + self.k)]))
+        for i in range(len(item) - (k - 1)):
+            ng.append(tuple(item[i : (i + k)]))
 
         return list(set(ng))
 
@@ -93,6 +186,41 @@ class SL(L):
         else:
             opposite = self.opposite_polarity(self.alphabet)
             self.fsm.sl_to_fsm(opposite)
+        self._cache["fsm"] = self.fsm
+
+    def get_fsm(self):
+        """Returns the FSM of the grammar, rebuilding it if the grammar was
+        not fsmized yet or was changed since.
+
+        Returns:
+            FSM: the FSM of the current grammar.
+        """
+        if self._cache.get("fsm") is not self.fsm:
+            self.fsmize()
+        return self.fsm
+
+    def compile_acceptor(self):
+        """Compiles the grammar into an acceptor over integer-packed ngrams.
+
+        Returns:
+            SLAcceptor: the compiled acceptor.
+        """
+        if not self.grammar:
+            raise (IndexError("The grammar must not be empty."))
+        if not self.alphabet:
+            raise ValueError(
+                "The alphabet is not provided. " "Use `grammar.extract_alphabet()`."
+            )
+
+        polar = self.check_polarity()
+        return SLAcceptor(
+            self.symbol_table(),
+            self.packed_grammar(),
+            self.k,
+            self.edges,
+            polar,
+            alphabet=self.alphabet if polar == "n" else None,
+        )
 
     def scan(self, string):
         """Checks if the given string is well-formed with respect to the given
@@ -103,13 +231,20 @@ class SL(L):
         Returns:
             bool: well-formedness value of a string.
         """
-        if not self.fsm.transitions:
-            self.fsmize()
-
-        string = self.annotate_string(string)
-        return self.fsm.scan_sl(string)
-
-    def generate_sample(self, n=10, repeat=True, safe=True):
+        return self.get_acceptor().scan(string)
+
+    def generate_sample(
+        self,
+        n=10,
+        repeat=True,
+        safe=True,
+        vectorized=False,
+        seed=None,
+        max_len=None,
+        by_length=False,
+        workers=1,
+        weighted=False,
+    ):
         """Generates a data sample of the required size, with or without
         repetitions depending on `repeat` value.
 
@@ -117,19 +252,37 @@ class SL(L):
             n (int): the number of examples to be generated;
             repeat (bool): allows (rep=True) or prohibits (rep=False)
                repetitions within the list of generated items;
-            safe (bool): automatically breaks out of infinite loops,
-                for example, when the grammar cannot generate the
-                required number of data items, and the repetitions
-                are set to False.
+            safe (bool): if the grammar cannot generate the required
+                number of data items and the repetitions are set to
+                False, returns all the strings it can generate instead
+                of raising a ValueError;
+            vectorized (bool): generates the sample in batches over
+                integer-encoded states, see `generate_batch`;
+            seed (int): seed of the random generator; the sample is
+                generated in chunks with streams derived from it, see
+                `seeded_chunks`;
+            max_len (int): without repetitions, draws the strings
+                uniformly among the strings up to this length, see
+                `generate_unique`; if not given, random strings are
+                generated until n distinct ones are found, as with
+                repetitions, see `sample_distinct`;
+            by_length (bool): with max_len, chooses the length of every
+                string uniformly instead of choosing uniformly among all
+                strings, see `generate_unique`;
+            workers (int): number of processes among which the chunks
+                of the sample are distributed; the sample for a given
+                seed does not depend on it, see `map_chunks`;
+            weighted (bool): with repetitions, chooses every next symbol
+                proportionally to the frequency of the ngram it creates,
+                see `learn`; not combined with `vectorized`.
         Returns:
             list: generated data sample.
         """
         if not self.alphabet:
             raise ValueError("Alphabet cannot be empty.")
-        if not self.fsm.transitions:
-            self.fsmize()
+        self.get_fsm()
 
-        statemap = self.state_map()
+        statemap = self._state_map()
         if not any([len(statemap[x]) for x in statemap]):
             raise (
                 ValueError(
@@ -139,66 +292,202 @@ class SL(L):
                 )
             )
 
-        data = [self.generate_item(statemap) for i in range(n)]
-
         if not repeat:
-            data = set(data)
-            useless_loops = 0
-            prev_len = len(data)
-
-            while len(data) < n:
-                data.add(self.generate_item(statemap))
-
-                if prev_len == len(data):
-                    useless_loops += 1
-                else:
-                    useless_loops = 0
-
-                if safe and useless_loops > 500:
-                    print(
-                        "The grammar cannot produce the requested "
-                        "number of strings. Check the grammar, "
-                        "reduce the number, or allow repetitions."
-                    )
-                    break
+            rng = make_rng(seed)
+            if max_len is None:
+                draw = lambda: self.generate_item(statemap, rng)
+                return self.sample_distinct(n, draw, safe)
+            return self.generate_unique(
+                n, self.paths(max_len), by_length, safe, rng, workers
+            )
 
-        return list(data)
+        if weighted:
+            if self.counts is None:
+                raise ValueError(
+                    "The ngram frequencies are not collected. "
+                    "Run `grammar.learn(counts=True)`."
+                )
+            compiled = self._state_map(weights=self.counts)
+        elif vectorized:
+            compiled = self.state_table(statemap)
+        else:
+            compiled = statemap
+        chunks = self.seeded_chunks(n, seed)
+        return self.map_chunks("generate_chunk", (compiled,), chunks, workers)
+
+    def generate_chunk(self, compiled, size, seed):
+        """Generates a chunk of the sample with its own random stream.
+
+        Arguments:
+            compiled (list or dict): the encoded states, see
+                `state_table`, or the state map, see `_state_map`;
+            size (int): the number of strings to be generated;
+            seed (int): the seed of the chunk, see `seeded_chunks`.
+        Returns:
+            list: generated strings.
+        """
+        rng = Random(seed)
+        if isinstance(compiled, list):
+            return self.generate_batch(size, compiled, rng)
+        return [self.generate_item(compiled, rng) for i in range(size)]
 
-    def generate_item(self, statemap):
+    def generate_item(self, statemap, rng=None):
         """Generates a well-formed string with respect to the given grammar.
 
         Arguments:
             statemap (dict): a dictionary of possible transitions in the
-                corresponding fsm; constructed inside generate_sample.
+                corresponding fsm; constructed inside generate_sample,
+                optionally weighted, see `state_map`; its keys can also
+                be tuples of symbols, see `_state_map`;
+            rng (Random): the random generator, see `make_rng`.
         Returns:
             str: a well-formed string.
         """
-        word = self.edges[0] * (self.k - 1)
+        rng = make_rng(rng=rng)
+        joined = isinstance(next(iter(statemap), ()), str)
+        word = [self.edges[0]] * (self.k - 1)
         while word[-1] != self.edges[1]:
-            word += choice(statemap[word[-(self.k - 1) :]])
-        return word[(self.k - 1) : -1]
+            state = word[-(self.k - 1) :]
+            options = statemap["".join(state) if joined else tuple(state)]
+            if isinstance(options, tuple):
+                word.append(rng.choices(*options)[0])
+            else:
+                word.append(rng.choice(options))
+        return self.join_symbols(word[(self.k - 1) : -1])
+
+    def acceptor_table(self):
+        """Encodes the FSM of the grammar as a table of integer states.
+
+        Returns:
+            list: the encoded states, see `state_table`.
+        """
+        self.get_fsm()
+        return self.state_table(self._state_map())
+
+    def state_table(self, statemap):
+        """Encodes the states of a state map as integers.
+
+        Arguments:
+            statemap (dict): a dictionary of possible transitions in the
+                corresponding fsm, keyed by tuples, see `_state_map`.
+        Returns:
+            list: for every state, a list of pairs (next symbol, next
+                state); the initial state is 0, and the end of the
+                string is encoded as -1.
+        """
+        start = (self.edges[0],) * (self.k - 1)
+        if start not in statemap:
+            raise ValueError("The grammar does not generate any strings.")
+
+        states = [start] + [i for i in statemap if i != start]
+        index = {state: i for i, state in enumerate(states)}
+
+        table = []
+        for state in states:
+            moves = []
+            for symbol in statemap[state]:
+                new = (state + (symbol,))[-(self.k - 1) :]
+                if symbol in [m[0] for m in moves]:
+                    continue
+                if symbol == self.edges[1]:
+                    moves.append((symbol, -1))
+                elif new in index:
+                    moves.append((symbol, index[new]))
+            table.append(moves)
+
+        return table
+
+    def generate_batch(self, n, table, rng):
+        """Generates n well-formed strings by walking the integer-encoded
+        state table with all of them at once: at every step, the strings
+        that are still being generated are grouped by their current
+        state, and the moves of every group are drawn by a single call
+        to the random generator.
 
-    def state_map(self):
+        Arguments:
+            n (int): the number of strings to be generated;
+            table (list): the encoded states, see `state_table`;
+            rng (Random): the random generator.
+        Returns:
+            list: generated strings.
+        """
+        words = [[] for i in range(n)]
+        active = {0: range(n)} if n else {}
+        while active:
+            moved = {}
+            for state, group in active.items():
+                moves = table[state]
+                if not moves:
+                    raise ValueError(
+                        "There are ngrams in the grammar that are"
+                        " not leading anywhere. Clean the grammar "
+                        " or run `grammar.clean_grammar()`."
+                    )
+                for i, (symbol, q) in zip(group, rng.choices(moves, k=len(group))):
+                    if q >= 0:
+                        words[i].append(symbol)
+                        moved.setdefault(q, []).append(i)
+            active = moved
+
+        return [self.join_symbols(word) for word in words]
+
+    def state_map(self, weights=None):
         """
         Generates a dictionary of possible transitions in the FSM.
+        Arguments:
+            weights (dict): optional weights of the ngrams of the form
+                {ngram: weight}; ngrams that are not listed get weight 0.
         Returns:
             dict: the dictionary of the form
                 {"keys":[list of possible next symbols]}, where 
-                keys are (k-1)-long strings.
+                keys are (k-1)-long strings; if weights are given,
+                the values are pairs ([next symbols], [their weights]),
+                except for the states whose weights are all 0: their
+                next symbols stay equally likely.
         """
-        local_alphabet = self.alphabet[:] + self.edges[:]
-        poss = product(local_alphabet, repeat=(self.k - 1))
+        smap = self._state_map(weights)
+        return {"".join(state): options for state, options in smap.items()}
 
+    def _state_map(self, weights=None):
+        """Generates the state map in a single pass over the transitions of
+        the FSM, see `state_map`; the keys are tuples of k-1 symbols, so
+        that multi-character symbols stay apart."""
         smap = {}
-        for i in poss:
-            for j in self.fsm.transitions:
-                if j[0] == i:
-                    before = "".join(i)
-                    if before in smap:
-                        smap[before] += j[1]
-                    else:
-                        smap[before] = [j[1]]
-        return smap
+        for prev, symbol, _ in self.fsm.transitions:
+            smap.setdefault(tuple(prev), []).append(symbol)
+
+        if weights is None:
+            return smap
+
+        weighted = {}
+        for state, symbols in smap.items():
+            values = [weights.get(state + (s,), 0) for s in symbols]
+            weighted[state] = (symbols, values) if any(values) else symbols
+        return weighted
+
+    def dump(self, data=False):
+        """Describes the grammar and the collected ngram frequencies by a
+        header and typed arrays, see `L.save`.
+
+        Arguments:
+            data (bool): also includes the training data.
+        Returns:
+            tuple: a JSON-serializable header and the arrays.
+        """
+        header, sections = super().dump(data)
+        if self.counts is not None:
+            table = self.symbol_table()
+            sections["counts"] = encode_ngrams(table, list(self.counts), self.k)
+            sections["count_values"] = array("Q", self.counts.values())
+        return header, sections
+
+    def restore(self, header, sections):
+        """Restores the grammar from its description, see `dump`."""
+        super().restore(header, sections)
+        self.fsm = FSM(initial=self.edges[0], final=self.edges[1])
+        if "counts" in sections:
+            ngrams = decode_ngrams(header["symbols"], sections["counts"], self.k)
+            self.counts = Counter(dict(zip(ngrams, sections["count_values"])))
 
     def switch_polarity(self):
         """Changes polarity of the grammar, and changes the grammar to the
@@ -217,8 +506,7 @@ class SL(L):
         from which one cannot get     to the final symbol, and removes
         them.
         """
-        if not self.fsm.transitions:
-            self.fsmize()
+        self.get_fsm()
 
         if self.check_polarity() == "n":
             self.grammar = list(set(self.grammar))
@@ -6,13 +6,20 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
-from random import choice
+from random import Random
 from itertools import product
 
 from sigmapie.grammar import *
 from sigmapie.fsm import *
 from sigmapie.fsm_family import *
 from sigmapie.helper import *
+from sigmapie.acceptors import *
+from sigmapie.profiling import *
+from sigmapie.progress import *
+
+# states of the automaton explored to draw distinct strings up to a length
+# bound exactly; larger automata are sampled by rejection instead
+EXACT_SAMPLING_STATES = 10000
 
 
 class SP(L):
@@ -62,60 +69,117 @@ class SP(L):
         return list(set([tuple(i) for i in result]))
 
     def learn(self):
-        """Extracts k-long subsequences from the training data.
+        """Extracts k-long subsequences from the training data in a single
+        pass over it; if the alphabet is not provided, it is collected in
+        the same pass.
 
         Results:
             self.grammar is updated.
         """
         if not self.data:
             raise ValueError("The data must be provided.")
-        if not self.alphabet:
-            raise ValueError(
-                "The alphabet must be provided. To "
-                "extract the alphabet automatically, "
-                "run `grammar.extract_alphabet()`."
-            )
-
-        self.grammar = []
-        for i in self.data:
-            for j in self.subsequences(i):
-                if j not in self.grammar:
-                    self.grammar.append(j)
-
-        if self.check_polarity() == "n":
-            self.grammar = self.opposite_polarity()
+
+        prof = active_profile()
+        with prof.phase("SP.learn"):
+            grammar, seen, symbols, strings = [], set(), set(), 0
+            with prof.phase("subsequences"):
+                for i in self.data:
+                    symbols.update(i)
+                    for j in self.subsequences(i):
+                        if j not in seen:
+                            seen.add(j)
+                            grammar.append(j)
+                    strings += 1
+            prof.count("strings", strings)
+            prof.count("subsequences", len(grammar))
+
+            if not self.alphabet:
+                self.alphabet = sorted(symbols)
+            self.grammar = grammar
+
+            if self.check_polarity() == "n":
+                with prof.phase("polarity"):
+                    self.grammar = self.opposite_polarity()
 
     def opposite_polarity(self):
         """Returns the grammar opposite to the current one."""
         all_ngrams = product(self.alphabet, repeat=self.k)
-        return [i for i in all_ngrams if i not in self.grammar]
+        listed = set(tuple(i) for i in self.grammar)
+        return [i for i in all_ngrams if i not in listed]
 
-    def fsmize(self):
+    def fsmize(self, progress=None, timeout=None, cancel=None):
         """Creates FSM family for the given SP grammar by passing every
-        encountered subsequence through the corresponding automaton."""
+        encountered subsequence through the corresponding automaton.
+
+        Arguments:
+            progress (callable): receives reports on the processed
+                templates, see `Progress`;
+            timeout (float): the time budget in seconds;
+            cancel (callable or Event): stops the construction when it
+                returns True or is set.
+        Raises:
+            Cancelled: if the construction was cancelled or ran out of
+                time; the fsm attribute is left as it was.
+        """
         if not self.grammar:
             self.learn()
 
-        if self.check_polarity() == "p":
-            data_subseq = self.grammar[:]
-        else:
-            data_subseq = self.opposite_polarity()
+        tracker = make_progress(progress, timeout, cancel)
+        prof = active_profile()
+        with prof.phase("SP.fsmize"):
+            if self.check_polarity() == "p":
+                data_subseq = self.grammar[:]
+            else:
+                data_subseq = self.opposite_polarity()
+
+            # create a family of templates
+            family = FSMFamily()
+            with prof.phase("templates"):
+                tracker.phase("templates", len(self.alphabet) ** (self.k - 1))
+                seq = product(self.alphabet, repeat=self.k - 1)
+                for path in tracked(seq, tracker):
+                    f = FSM(initial=None, final=None)
+                    f.sp_build_template(path, self.alphabet, self.k)
+                    family.family.append(f)
+            prof.count("templates", len(family.family))
+
+            # run the input/grammar through the fsm family
+            with prof.phase("fill"):
+                tracker.phase("fill", len(family.family))
+                for f in tracked(family.family, tracker):
+                    for r in data_subseq:
+                        f.sp_fill_template(r)
+
+            # clean the untouched transitions
+            with prof.phase("clean"):
+                for f in family.family:
+                    f.sp_clean_template()
+            prof.count("transitions", sum(len(f.transitions) for f in family.family))
+
+        self.fsm = family
+        tracker.finish()
+
+    def acceptor_table(self):
+        """Encodes the automaton tracking the subsequences of the read
+        string as a table of integer states.
 
-        # create a family of templates in fsm attribute
-        seq = product(self.alphabet, repeat=self.k - 1)
-        for path in seq:
-            f = FSM(initial=None, final=None)
-            f.sp_build_template(path, self.alphabet, self.k)
-            self.fsm.family.append(f)
+        Returns:
+            list: the encoded states, see `L.acceptor_table`.
+        """
+        return self.get_acceptor().table(self.alphabet)
 
-        # run the input/grammar through the fsm family
-        for f in self.fsm.family:
-            for r in data_subseq:
-                f.sp_fill_template(r)
+    def paths(self, max_len):
+        """Counts the well-formed strings up to the given length over the
+        states of the automaton that are reached within that length, see
+        `AcceptorCounts`: the whole automaton can have exponentially many
+        states in the size of the alphabet.
 
-        # clean the untouched transitions
-        for f in self.fsm.family:
-            f.sp_clean_template()
+        Arguments:
+            max_len (int): the maximal length of the strings.
+        Returns:
+            AcceptorCounts: the counts of the strings.
+        """
+        return AcceptorCounts(self.get_acceptor(), self.alphabet, max_len)
 
     def scan(self, string):
         """Tells if the input string is well-formed.
@@ -125,37 +189,57 @@ class SP(L):
         Returns:
             bool: True is well-formed, otherwise False.
         """
-        subseq = self.subsequences(string)
-        found_in_G = [(s in self.grammar) for s in subseq]
-
-        if self.check_polarity == "p":
-            return all(found_in_G)
-        else:
-            return not any(found_in_G)
+        return self.get_acceptor().scan(string)
 
-    def generate_item(self):
-        """Generates a well-formed string.
+    def compile_acceptor(self):
+        """Compiles the grammar into an automaton that tracks the
+        subsequences of the string read so far.
 
         Returns:
-            str: the generated string.
+            SPAcceptor: the compiled automaton.
         """
         if not self.alphabet:
             raise ValueError("The alphabet must be provided.")
+        return SPAcceptor(
+            self.grammar, self.alphabet, self.k, self.edges, self.check_polarity()
+        )
 
-        string = ""
+    def generate_item(self, acceptor=None, rng=None):
+        """Generates a well-formed string. The symbols that can follow the
+        generated prefix are read off the state of the automaton.
+
+        Arguments:
+            acceptor (SPAcceptor): the compiled automaton of the
+                grammar; the compiled one is used if not given;
+            rng (Random): the random generator, see `make_rng`.
+        Returns:
+            str: the generated string.
+        """
+        if acceptor is None:
+            acceptor = self.get_acceptor()
+        rng = make_rng(rng=rng)
+
+        state, string = acceptor.initial_state(), []
         while True:
-            options = []
-            for i in self.alphabet:
-                if self.scan(string + i):
-                    options.append(i)
+            options = [i for i in self.alphabet if not state & acceptor.banned[i]]
 
-            add = choice(options + ["EOS"])
+            add = rng.choice(options + ["EOS"])
             if add == "EOS":
-                return string
+                return self.join_symbols(string)
             else:
-                string += add
-
-    def generate_sample(self, n=10, repeat=False, safe=True):
+                state = acceptor.step(state, add)
+                string.append(add)
+
+    def generate_sample(
+        self,
+        n=10,
+        repeat=False,
+        safe=True,
+        seed=None,
+        max_len=None,
+        by_length=False,
+        workers=1,
+    ):
         """Generates data sample of desired length.
 
         Arguments:
@@ -163,34 +247,64 @@ class SP(L):
                 the default value is 10;
             repeat (bool): allow (rep=True) or prohibit (rep=False)
                repetitions, the default value is False;
-            safe (bool): automatically break out of infinite loops,
-                for example, when the grammar cannot generate the
-                required number of data items, and the repetitions
-                are set to False.
+            safe (bool): if the grammar cannot generate the required
+                number of data items and the repetitions are set to
+                False, return all the strings it can generate instead
+                of raising a ValueError;
+            seed (int): seed of the random generator; the sample is
+                generated in chunks with streams derived from it, see
+                `seeded_chunks`;
+            max_len (int): without repetitions, draws the strings
+                uniformly among the strings up to this length, see
+                `generate_unique`; if not given, random strings are
+                generated until n distinct ones are found, as with
+                repetitions, see `sample_distinct`. If more than
+                EXACT_SAMPLING_STATES states of the automaton are
+                reachable within this length, random strings up to
+                this length are generated instead;
+            by_length (bool): with max_len, choose the length of every
+                string uniformly, see `generate_unique`; ignored when
+                the strings are generated at random;
+            workers (int): number of processes among which the chunks
+                of the sample are distributed, see `map_chunks`.
         Returns:
             list: a list of generated examples.
         """
-        sample = [self.generate_item() for i in range(n)]
+        acceptor = self.get_acceptor()
 
         if not repeat:
-            useless_loops = 0
-            sample = set(sample)
-            prev_len = len(sample)
-
-            while len(list(set(sample))) < n:
-                sample.add(self.generate_item())
-                if prev_len == len(sample):
-                    useless_loops += 1
-                else:
-                    useless_loops = 0
-
-                if safe and useless_loops > 100:
-                    print(
-                        "The grammar cannot produce the requested number" " of strings."
-                    )
-                    break
-
-        return list(sample)
+            rng = make_rng(seed)
+            if max_len is None:
+                draw = lambda: self.generate_item(acceptor, rng)
+                return self.sample_distinct(n, draw, safe, patience=100)
+            paths = self.paths(max_len)
+            if paths.explore(EXACT_SAMPLING_STATES):
+                return self.generate_unique(n, paths, by_length, safe, rng, workers)
+
+            def draw():
+                while True:
+                    string = self.generate_item(acceptor, rng)
+                    if len(string) <= max_len:
+                        return string
+
+            return self.sample_distinct(n, draw, safe, patience=100)
+
+        chunks = self.seeded_chunks(n, seed)
+        return self.map_chunks("generate_chunk", (acceptor,), chunks, workers)
+
+    def generate_chunk(self, acceptor, size, seed):
+        """Generates a chunk of the sample with its own random stream.
+
+        Arguments:
+            acceptor (SPAcceptor): the compiled automaton of the
+                grammar, see `get_acceptor`;
+            size (int): the number of strings to be generated;
+            seed (int): the seed of the chunk, see `seeded_chunks`.
+        Returns:
+            list: generated strings.
+        """
+        rng = Random(seed)
+        return [self.generate_item(acceptor, rng) for i in range(size)]
 
     def switch_polarity(self, new_polarity=None):
         """Changes the polarity of the grammar.
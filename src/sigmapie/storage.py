@@ -0,0 +1,249 @@
+"""A compact binary format for learned grammars and transducers. Copyright
+(C) 2019  Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+# file signature and the current version of the format
+MAGIC = b"SIGMAPIE"
+FORMAT_VERSION = 1
+
+# sections start at offsets that are multiples of this number
+ALIGNMENT = 8
+
+
+def code_typecode(base):
+    """Returns the smallest array typecode that can store the codes of the
+    given number of symbols."""
+    if base <= 1 << 8:
+        return "B"
+    if base <= 1 << 16:
+        return "H"
+    return "I"
+
+
+def encode_ngrams(table, ngrams, k):
+    """Encodes ngrams as a flat array of symbol codes.
+
+    Arguments:
+        table (SymbolTable): the encoding of the symbols;
+        ngrams (list): ngrams of the length k;
+        k (int): the length of the ngrams.
+    Returns:
+        array: the codes of the symbols of all ngrams in a row.
+    """
+    codes = array(code_typecode(table.base))
+    for ngram in ngrams:
+        if len(ngram) != k:
+            raise ValueError("All ngrams of the grammar must be of length k.")
+        codes.extend(table.encode(ngram))
+    return codes
+
+
+def decode_ngrams(symbols, codes, k):
+    """Decodes a flat array of symbol codes into ngrams.
+
+    Arguments:
+        symbols (list): the encoded symbols in the order of their codes;
+        codes (array): the codes of the symbols of all ngrams in a row;
+        k (int): the length of the ngrams.
+    Returns:
+        list: the ngrams as tuples of symbols.
+    """
+    return [
+        tuple(symbols[c] for c in codes[i : i + k]) for i in range(0, len(codes), k)
+    ]
+
+
+class RecordArray(object):
+    """A read-only list of tuples of strings stored as an array of indices
+    of the strings, such as a memory-mapped section: the tuples are only
+    decoded when they are read.
+
+    Attributes:
+        strings (list): the strings in the order of their indices;
+        index (dict): mapping of the strings to their indices;
+        codes (sequence): the indices of the fields of all tuples in a row;
+        width (int): the number of fields of a tuple.
+    """
+
+    def __init__(self, strings, codes, width):
+        """Wraps the given indices without copying them."""
+        self.strings = strings
+        self.index = {s: i for i, s in enumerate(strings)}
+        self.codes = codes
+        self.width = width
+
+    def __len__(self):
+        """Returns the number of the tuples."""
+        return len(self.codes) // self.width
+
+    def __getitem__(self, i):
+        """Decodes the tuple at the given position, or a list of tuples if
+        given a slice."""
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("The record index is out of range.")
+        start = i * self.width
+        return tuple(self.strings[c] for c in self.codes[start : start + self.width])
+
+    def __iter__(self):
+        """Iterates over the decoded tuples."""
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other):
+        """Compares the tuples with the ones of another sequence."""
+        if not isinstance(other, (RecordArray, list, tuple)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        """Shows the tuples as a list."""
+        return repr(list(self))
+
+    def __getstate__(self):
+        """Copies the indices when they are a view, which cannot be
+        pickled."""
+        state = dict(self.__dict__)
+        if isinstance(self.codes, memoryview):
+            state["codes"] = array(self.codes.format, self.codes)
+        return state
+
+    def find(self, *fields):
+        """Finds the first tuple that starts with the given fields without
+        decoding the other tuples.
+
+        Arguments:
+            *fields (str): the first fields of the tuple.
+        Returns:
+            tuple: the decoded tuple, or None if there is no such tuple.
+        """
+        wanted = [self.index.get(s) for s in fields]
+        if None in wanted:
+            return None
+        codes, width = self.codes, self.width
+        for start in range(0, len(codes), width):
+            for i, c in enumerate(wanted):
+                if codes[start + i] != c:
+                    break
+            else:
+                return self[start // width]
+        return None
+
+
+def encode_text(value):
+    """Stores a JSON-serializable value as a section of bytes."""
+    return array("B", json.dumps(value).encode("utf-8"))
+
+
+def decode_text(section):
+    """Restores a value stored by `encode_text`."""
+    return json.loads(bytes(section).decode("utf-8"))
+
+
+def align(offset):
+    """Rounds the offset up to the closest multiple of the alignment."""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_sections(path, header, sections):
+    """Writes a file that consists of a JSON header and of typed arrays.
+
+    Arguments:
+        path (str): the path of the file;
+        header (dict): JSON-serializable description of the object;
+        sections (dict): arrays of the object, {name: array}.
+    """
+    layout, offset = [], 0
+    for name, values in sections.items():
+        offset = align(offset)
+        layout.append([name, values.typecode, offset, len(values)])
+        offset += len(values) * values.itemsize
+
+    header = dict(header, byteorder=sys.byteorder, sections=layout)
+    blob = json.dumps(header).encode("utf-8")
+    start = align(len(MAGIC) + 8 + len(blob))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<II", FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        for (name, typecode, offset, length), values in zip(
+            layout, sections.values()
+        ):
+            f.write(b"\0" * (start + offset - f.tell()))
+            values.tofile(f)
+
+
+def read_header(content):
+    """Reads the header of the file content written by `write_sections`.
+
+    Arguments:
+        content (bytes): the content of the file.
+    Returns:
+        tuple: the header and the offset at which the sections start.
+    """
+    if content[: len(MAGIC)] != MAGIC:
+        raise ValueError("The file is not a saved SigmaPie object.")
+    version, size = struct.unpack_from("<II", content, len(MAGIC))
+    if version > FORMAT_VERSION:
+        raise ValueError(
+            "The file was saved in a newer format (version "
+            + str(version)
+            + "). Update the package to load it."
+        )
+
+    begin = len(MAGIC) + 8
+    header = json.loads(bytes(content[begin : begin + size]).decode("utf-8"))
+    return header, align(begin + size)
+
+
+def read_sections(path, use_mmap=False):
+    """Reads a file written by `write_sections`.
+
+    Arguments:
+        path (str): the path of the file;
+        use_mmap (bool): maps the file into memory read-only and returns
+            the sections as views of the mapped pages instead of
+            copying them: processes mapping the same file share its
+            physical pages.
+    Returns:
+        tuple: the header and the sections, {name: array or memoryview}.
+    """
+    with open(path, "rb") as f:
+        if use_mmap:
+            content = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        else:
+            content = f.read()
+
+    header, start = read_header(content)
+    swap = header["byteorder"] != sys.byteorder
+    sections = {}
+    for name, typecode, offset, length in header["sections"]:
+        values = array(typecode)
+        begin = start + offset
+        chunk = content[begin : begin + length * values.itemsize]
+        if use_mmap and not swap:
+            sections[name] = chunk.cast(typecode)
+            continue
+        values.frombytes(chunk)
+        if swap:
+            values.byteswap()
+        sections[name] = values
+
+    return header, sections
@@ -0,0 +1,201 @@
+"""A shared integer encoding of symbols and ngrams. Copyright (C) 2019  Alena
+Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+from array import array
+from bisect import bisect_left
+
+
+class SymbolTable(object):
+    """A mapping of symbols to small integers.
+
+    Ngrams are packed into single integers in base |symbols|, which are
+    cheaper to store and to hash than tuples of strings. Packed ngrams
+    only identify ngrams of the same length: compare ngrams of
+    different lengths as tuples.
+    Attributes:
+        symbols (list): the encoded symbols in the order of their codes;
+        code (dict): mapping of the symbols to their codes;
+        base (int): the number of encoded symbols.
+    """
+
+    def __init__(self, symbols):
+        """Encodes the given symbols, ignoring repetitions."""
+        self.symbols = []
+        self.code = {}
+        for s in symbols:
+            if s not in self.code:
+                self.code[s] = len(self.symbols)
+                self.symbols.append(s)
+        self.base = len(self.symbols)
+
+    def encode(self, string):
+        """Encodes a sequence of symbols.
+
+        Arguments:
+            string (str): a sequence of symbols.
+        Returns:
+            list: the codes of the symbols.
+        """
+        try:
+            return [self.code[s] for s in string]
+        except KeyError as e:
+            raise ValueError("Unknown symbol " + repr(e.args[0]) + ".")
+
+    def decode(self, codes):
+        """Decodes a sequence of codes.
+
+        Arguments:
+            codes (list): codes of the symbols.
+        Returns:
+            tuple: the symbols.
+        """
+        return tuple(self.symbols[c] for c in codes)
+
+    def pack(self, ngram):
+        """Packs an ngram into a single integer.
+
+        Arguments:
+            ngram (tuple): an ngram of symbols.
+        Returns:
+            int: the packed ngram, or -1 if it contains unknown symbols.
+        """
+        packed = 0
+        for s in ngram:
+            if s not in self.code:
+                return -1
+            packed = packed * self.base + self.code[s]
+        return packed
+
+    def unpack(self, packed, k):
+        """Restores an ngram from its packed form.
+
+        Arguments:
+            packed (int): the packed ngram;
+            k (int): the length of the ngram.
+        Returns:
+            tuple: the ngram of symbols.
+        """
+        base, symbols, ngram = self.base, self.symbols, ()
+        for i in range(k):
+            packed, c = divmod(packed, base)
+            ngram = (symbols[c],) + ngram
+        return ngram
+
+    def pack_all(self, ngrams):
+        """Packs a collection of ngrams of the same length.
+
+        Arguments:
+            ngrams (list): ngrams of symbols.
+        Returns:
+            set: the packed ngrams without the ones containing unknown
+                symbols.
+        """
+        packed = {self.pack(n) for n in ngrams}
+        packed.discard(-1)
+        return packed
+
+
+class PackedNgrams(object):
+    """A read-only collection of packed ngrams stored as a sorted sequence
+    of integers, such as a memory-mapped array; membership is tested by
+    binary search without copying the sequence.
+
+    Attributes:
+        values (sequence): the sorted packed ngrams.
+    """
+
+    def __init__(self, values):
+        """Wraps the given sorted sequence."""
+        self.values = values
+
+    def __contains__(self, packed):
+        """Tells if the packed ngram is in the collection."""
+        i = bisect_left(self.values, packed)
+        return i < len(self.values) and self.values[i] == packed
+
+    def __iter__(self):
+        """Iterates over the packed ngrams in increasing order."""
+        return iter(self.values)
+
+    def __len__(self):
+        """Returns the number of the packed ngrams."""
+        return len(self.values)
+
+
+class Tokenizer(object):
+    """Splits strings into segments of a given inventory, such as symbols
+    with diacritics or digraphs, always choosing the longest segment that
+    matches at the current position.
+
+    Every string is converted once into an array of integer segment ids,
+    which the grammar classes read as a sequence of symbols; `decode`
+    restores the segments.
+    Attributes:
+        segments (list): the inventory of segments in the order of their
+            ids;
+        index (dict): mapping of the segments to their ids;
+        lengths (list): lengths of the segments, the longest first.
+    """
+
+    def __init__(self, segments):
+        """Initializes the Tokenizer object."""
+        self.segments = []
+        self.index = {}
+        for s in segments:
+            if s not in self.index:
+                self.index[s] = len(self.segments)
+                self.segments.append(s)
+        self.lengths = sorted({len(s) for s in self.segments}, reverse=True)
+
+    def tokenize(self, string):
+        """Splits a string into segments.
+
+        Arguments:
+            string (str): the string that needs to be split.
+        Returns:
+            array: the ids of the segments of the string.
+        """
+        ids, i = array("I"), 0
+        while i < len(string):
+            for length in self.lengths:
+                if string[i : i + length] in self.index:
+                    ids.append(self.index[string[i : i + length]])
+                    i += length
+                    break
+            else:
+                raise ValueError(
+                    "Cannot segment " + repr(string) + " at position " + str(i) + "."
+                )
+        return ids
+
+    def encode(self, word):
+        """Converts a word into the ids of its segments.
+
+        Arguments:
+            word (str or tuple): a string, split by `tokenize`, or
+                a sequence of segments.
+        Returns:
+            array: the ids of the segments.
+        """
+        if isinstance(word, str):
+            return self.tokenize(word)
+        try:
+            return array("I", [self.index[s] for s in word])
+        except KeyError as e:
+            raise ValueError("Unknown segment " + repr(e.args[0]) + ".")
+
+    def decode(self, ids):
+        """Restores the segments of an encoded word.
+
+        Arguments:
+            ids (sequence): the ids of the segments, see `encode`.
+        Returns:
+            tuple: the segments of the word.
+        """
+        return tuple(self.segments[i] for i in ids)
@@ -0,0 +1,83 @@
+#!/bin/python3
+
+"""A module with the unittests for the cache module. Copyright (C) 2019
+Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import os
+import tempfile
+import unittest
+from cache import GrammarCache
+from sl_class import *
+from tsl_class import *
+
+
+class TestGrammarCache(unittest.TestCase):
+    """Tests for the cache of learned grammars."""
+
+    def setUp(self):
+        """Creates a temporary folder for the cache."""
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Removes the cached grammars."""
+        self.folder.cleanup()
+
+    def test_restore(self):
+        """Checks that a grammar learned from the same data is restored,
+        and that different data or settings are learned anew."""
+        cache = GrammarCache(self.folder.name)
+        words = ["aaa", "bbb", "aab", "abb", "aaab", "abbb"]
+
+        learned = TSL(data=words, polar="n")
+        self.assertFalse(cache.learn(learned))
+        restored = TSL(data=words, polar="n")
+        self.assertTrue(cache.learn(restored))
+        self.assertEqual(restored.grammar, learned.grammar)
+        self.assertEqual(restored.tier, learned.tier)
+        self.assertEqual(restored.alphabet, ["a", "b"])
+        self.assertEqual(restored.data, words)
+
+        self.assertFalse(cache.learn(TSL(data=words[1:], polar="n")))
+        self.assertFalse(cache.learn(TSL(data=words, polar="p")))
+        counted = SL(data=words)
+        self.assertFalse(cache.learn(counted, counts=True))
+        again = SL(data=words)
+        self.assertTrue(cache.learn(again, counts=True))
+        self.assertEqual(again.counts, counted.counts)
+
+    def test_execution_options(self):
+        """Checks that the options controlling the learner but not the
+        learned grammar are left out of the fingerprint."""
+        cache = GrammarCache(self.folder.name)
+        words = ["aaa", "bbb", "aab", "abb", "aaab", "abbb"]
+        reports = []
+        learned = TSL(data=words, polar="n")
+        self.assertFalse(cache.learn(learned, progress=reports.append, timeout=60))
+        self.assertTrue(reports)
+        restored = TSL(data=words, polar="n")
+        self.assertTrue(cache.learn(restored, cancel=lambda: False, timeout=5))
+        self.assertEqual(restored.grammar, learned.grammar)
+
+    def test_eviction(self):
+        """Checks that the least recently used grammars are removed once
+        the cache exceeds its size limit."""
+        cache = GrammarCache(self.folder.name, max_size=0)
+        cache.learn(SL(data=["ab"]))
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+        cache.max_size = 10 ** 6
+        cache.learn(SL(data=["ab"]))
+        cache.learn(SL(data=["ba"]))
+        self.assertEqual(len(os.listdir(self.folder.name)), 2)
+        cache.clear()
+        self.assertEqual(os.listdir(self.folder.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
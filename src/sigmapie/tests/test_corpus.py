@@ -0,0 +1,89 @@
+#!/bin/python3
+
+"""A module with the unittests for the corpus module. Copyright (C) 2019
+Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import os
+import gzip
+import tempfile
+import unittest
+from corpus import Corpus
+from sp_class import *
+from tsl_class import *
+
+
+class TestCorpus(unittest.TestCase):
+    """Tests for the streamed corpora."""
+
+    def setUp(self):
+        """Creates a temporary folder for the corpus files."""
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Removes the corpus files."""
+        self.folder.cleanup()
+
+    def write(self, name, text):
+        """Writes a corpus file and returns its path."""
+        path = os.path.join(self.folder.name, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_formats(self):
+        """Checks reading words from plain-text, TSV and gzipped files."""
+        plain = self.write("words.txt", "ab\n\n aab \n")
+        self.assertEqual(list(Corpus(plain)), ["ab", "aab"])
+
+        table = self.write("words.tsv.gz", "1\tab\n2\taab\n3\n")
+        self.assertEqual(list(Corpus(table, column=1)), ["ab", "aab"])
+
+        segmented = self.write("segments.txt", "sh a t\nt a\n")
+        words = list(Corpus(segmented, separator=" "))
+        self.assertEqual(words, [("sh", "a", "t"), ("t", "a")])
+
+    def test_learning(self):
+        """Checks that learners read a corpus like a list of strings and
+        collect the alphabet while learning."""
+        words = ["aaa", "bbb", "aab", "abb", "aaab", "abbb"]
+        path = self.write("words.txt", "\n".join(words))
+
+        sp = SP(polar="n", data=Corpus(path))
+        sp.learn()
+        self.assertEqual(sp.alphabet, ["a", "b"])
+        self.assertEqual(sp.grammar, [("b", "a")])
+
+        streamed = TSL(data=Corpus(path))
+        streamed.learn()
+        listed = TSL(alphabet=["a", "b"], data=words)
+        listed.learn()
+        self.assertEqual(streamed.alphabet, ["a", "b"])
+        self.assertEqual(streamed.tier, listed.tier)
+        self.assertEqual(set(streamed.grammar), set(listed.grammar))
+
+    def test_save_data(self):
+        """Checks that the words of a corpus are saved with the grammar."""
+        path = self.write("words.txt", "shat\ntasha\n")
+        saved = os.path.join(self.folder.name, "grammar")
+        tsl = TSL(data=Corpus(path))
+        tsl.learn()
+        tsl.save(saved, data=True)
+        self.assertEqual(TSL.load(saved).data, ["shat", "tasha"])
+
+        segments = Corpus(path, tokenizer=Tokenizer(["a", "t", "sh"]))
+        sl = SL(data=segments)
+        sl.extract_alphabet()
+        sl.learn()
+        sl.save(saved, data=True)
+        self.assertEqual(SL.load(saved).data, [[2, 0, 1], [1, 0, 2, 0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
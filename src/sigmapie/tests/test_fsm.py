@@ -136,6 +136,24 @@ class TestFSM(unittest.TestCase):
         f.trim_fsm()
         self.assertTrue(set(f.transitions) == goal)
 
+    def test_trim_fsm_shared_state(self):
+        """Checks trimming when a state is reached by several transitions
+        at once."""
+        f = FSM(initial=">", final="<")
+        f.transitions = [
+            ((">", ">"), "a", (">", "a")),
+            ((">", ">"), "c", (">", "c")),
+            ((">", "a"), "b", ("a", "b")),
+            ((">", "c"), "b", ("c", "b")),
+            (("a", "b"), "d", ("b", "d")),
+            (("c", "b"), "d", ("b", "d")),
+            (("b", "d"), "<", ("d", "<")),
+            (("d", "<"), "<", ("<", "<")),
+        ]
+        goal = set(f.transitions)
+        f.trim_fsm()
+        self.assertTrue(set(f.transitions) == goal)
+
 
 if __name__ == "__main__":
     unittest.main()
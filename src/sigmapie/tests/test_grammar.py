@@ -14,7 +14,8 @@ import sys, os
 sys.path.insert(0, os.path.join(os.path.abspath(".."), ""))
 
 import unittest
-from grammar import L
+from array import array
+from grammar import L, SymbolTable, Tokenizer
 
 
 class TestGeneralLanguages(unittest.TestCase):
@@ -117,6 +118,44 @@ class TestGeneralLanguages(unittest.TestCase):
         b.change_polarity()
         self.assertTrue(b.check_polarity() != old_polarity)
 
+    def test_seeded_chunks(self):
+        """Checks that the chunks cover the sample and that their seeds
+        only depend on the master seed."""
+        a = L()
+        chunks = a.seeded_chunks(2500, seed=11)
+        self.assertEqual([size for size, seed in chunks], [1000, 1000, 500])
+        self.assertEqual(chunks, a.seeded_chunks(2500, seed=11))
+        self.assertEqual(len({seed for size, seed in chunks}), 3)
+
+    def test_symbol_table(self):
+        """Checks packing and unpacking of ngrams and the packed grammar."""
+        table = SymbolTable([">", "<", "a", "b", "a"])
+        self.assertEqual(table.base, 4)
+        self.assertEqual(table.encode("ab"), [2, 3])
+        self.assertEqual(table.unpack(table.pack((">", "b")), 2), (">", "b"))
+        self.assertEqual(table.pack(("a", "c")), -1)
+        with self.assertRaises(ValueError):
+            table.encode("ac")
+
+        a = L(alphabet=["a", "b"], grammar=[(">", "a"), ("a", "b"), ("c", "<")])
+        packed = a.packed_grammar()
+        self.assertEqual(len(packed), 3)
+        self.assertIn(a.symbol_table().pack(("c", "<")), packed)
+        a.grammar = [("a", "a")]
+        self.assertEqual(a.packed_grammar(), {a.symbol_table().pack(("a", "a"))})
+
+    def test_tokenizer(self):
+        """Checks the longest-match segmentation into arrays of segment
+        ids."""
+        tok = Tokenizer(["t", "s", "ts", "a", "sh"])
+        ids = tok.tokenize("tsatash")
+        self.assertEqual(ids, array("I", [2, 3, 0, 3, 4]))
+        self.assertEqual(tok.decode(ids), ("ts", "a", "t", "a", "sh"))
+        self.assertEqual(tok.encode("tsash"), tok.encode(("ts", "a", "sh")))
+        self.assertEqual(tok.encode(("t", "s")), tok.encode("t") + tok.encode("s"))
+        with self.assertRaises(ValueError):
+            tok.tokenize("tx")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -9,6 +9,8 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+import os
+import tempfile
 import unittest
 import unittest.mock
 from mtsl_class import *
@@ -176,6 +178,21 @@ class TestMTSLLanguages(unittest.TestCase):
 
         self.assertTrue(correct)
 
+    def test_grammar_learning_workers(self):
+        """Checks that distributing the tiers among processes does not
+        change the learned grammar."""
+        data = ["aabb", "abab", "oopp", "opop", "apap", "obob", "aoao", "bpbp"]
+        a = MTSL(polar="n", data=data)
+        a.extract_alphabet()
+        a.learn()
+        b = MTSL(polar="n", data=data)
+        b.extract_alphabet()
+        b.learn(workers=2)
+        self.assertEqual(
+            {t: set(g) for t, g in a.grammar.items()},
+            {t: set(g) for t, g in b.grammar.items()},
+        )
+
     @unittest.mock.patch(
         # Artificially enforce a particular case of list(set())'s naturally-
         # occurring non-determinism with respect to ordering: 
@@ -198,6 +215,26 @@ class TestMTSLLanguages(unittest.TestCase):
         self.assertTrue(all({*tier} == {"a", "b", "x"} for tier, restrict \
                             in mtsl.grammar.items() if ("a", "b") in restrict))
 
+    def test_path(self):
+        """Checks that paths are extracted without duplicates."""
+        m = MTSL(alphabet=["a", "b"])
+        paths = m.path("aba")
+        expected = [
+            [">", set(), "a"],
+            [">", {"a"}, "b"],
+            [">", {"a", "b"}, "a"],
+            [">", {"a", "b"}, "<"],
+            ["a", set(), "b"],
+            ["a", {"b"}, "a"],
+            ["a", {"a", "b"}, "<"],
+            ["a", set(), "<"],
+            ["b", set(), "a"],
+            ["b", {"a"}, "<"],
+        ]
+        self.assertEqual(len(paths), len(expected))
+        for p in expected:
+            self.assertIn(p, paths)
+
     def test_convert_pos_to_neg(self):
         """Tests conversion of a positive grammar to a negative one."""
         z = MTSL(polar="p")
@@ -268,6 +305,100 @@ class TestMTSLLanguages(unittest.TestCase):
         for s in ["aoap", "popa", "pbapop", "pabp", "popoa"]:
             self.assertFalse(d.scan(s))
 
+    def test_scan_edges(self):
+        """Checks scanning and generation with multi-character edges."""
+        data = ["abpo", "aobp", "ab", "op", "abba"]
+        plain = MTSL(data=data)
+        plain.extract_alphabet()
+        plain.learn()
+        tagged = MTSL(data=data, edges=["<s>", "</s>"])
+        tagged.extract_alphabet()
+        tagged.learn()
+        for s in ["abpo", "ab", "op", "ba", "aa", "pobba"]:
+            self.assertEqual(tagged.scan(s), plain.scan(s))
+        sample = tagged.generate_sample(n=5, seed=1)
+        self.assertTrue(all(tagged.scan(s) for s in sample))
+
+    def test_scan_recompiles(self):
+        """Checks that replacing the grammar invalidates the compiled
+        acceptor."""
+        e = MTSL(polar="n")
+        e.grammar = {("a", "o"): [("a", "o")]}
+        self.assertFalse(e.scan("abo"))
+        self.assertTrue(e.scan("oba"))
+        e.grammar = {("a", "o"): [("o", "a")]}
+        self.assertTrue(e.scan("abo"))
+        self.assertFalse(e.scan("oba"))
+
+    def test_generate_sample(self):
+        """Checks that all generated strings are well-formed."""
+        f = MTSL(polar="n")
+        f.grammar = {
+            ("a", "o"): [("a", "o"), ("o", "a")],
+            ("b", "p"): [("b", "p"), ("p", "b")],
+        }
+        f.alphabet = ["a", "b", "o", "p", "x"]
+        self.assertTrue(all(f.scan(s) for s in f.generate_sample(200)))
+        sample = f.generate_sample(1200, seed=4, workers=2)
+        self.assertEqual(sample, f.generate_sample(1200, seed=4))
+
+    def test_cache_invalidation(self):
+        """Checks that derived structures are reused until the alphabet
+        or the grammar change."""
+        g = MTSL(polar="n")
+        g.grammar = {("a", "o"): [("a", "o"), ("o", "a")]}
+        g.alphabet = ["a", "o"]
+        smaps = g.tier_state_maps()
+        self.assertIs(smaps, g.tier_state_maps())
+        self.assertEqual(set(smaps[("a", "o")]), {">", "a", "o"})
+        self.assertTrue(all(isinstance(s, str) for s in g.general_state_map()))
+        automaton = g.product_automaton()
+        self.assertIs(automaton, g.product_automaton())
+        g.alphabet = ["a", "o", "x"]
+        self.assertIsNot(automaton, g.product_automaton())
+        g.grammar = {("a", "o"): [("a", "o")]}
+        self.assertIsNot(smaps, g.tier_state_maps())
+
+    def test_enumerate(self):
+        """Checks that the listed strings are well-formed and counted."""
+        h = MTSL(polar="n")
+        h.grammar = {("a", "o"): [("a", "o"), ("o", "a")]}
+        h.alphabet = ["a", "o", "x"]
+        strings = list(h.enumerate(3))
+        self.assertEqual(strings[:5], ["", "a", "o", "x", "aa"])
+        self.assertTrue(all(h.scan(s) for s in strings))
+        self.assertEqual(len(strings), h.count(3))
+
+    def test_save_load(self):
+        """Checks that the tiers and their restrictions are restored."""
+        f = MTSL(polar="n")
+        f.grammar = {
+            ("a", "o"): [("a", "o"), ("o", "a")],
+            ("b", "p"): [("b", "p")],
+        }
+        f.tier = list(f.grammar)
+        f.alphabet = ["a", "b", "o", "p"]
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "grammar")
+            f.save(path)
+            loaded = MTSL.load(path)
+            with self.assertRaises(ValueError):
+                SL.load(path)
+
+            mapped = MTSL.load(path, mmap=True)
+            for packed in mapped.packed_grammar().values():
+                self.assertIsInstance(packed.values, memoryview)
+            unpack = unittest.mock.patch.object(
+                SymbolTable, "unpack", side_effect=AssertionError
+            )
+            with unpack:
+                for w in ["abpo", "aobp", "ab", "pbo"]:
+                    self.assertEqual(mapped.scan(w), f.scan(w))
+            self.assertEqual(mapped.grammar, f.grammar)
+        self.assertEqual(loaded.grammar, f.grammar)
+        self.assertEqual(loaded.tier, f.tier)
+        self.assertFalse(loaded.scan("abpo"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -9,8 +9,12 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+import os
+import tempfile
 import unittest
+import importlib
 from ostia import ostia
+from fst_object import FST
 
 
 class TestOSTIA(unittest.TestCase):
@@ -44,6 +48,32 @@ class TestOSTIA(unittest.TestCase):
         self.assertTrue(set(t.E) == transitions)
         self.assertTrue(stout == t.stout)
 
+    def test_save_load(self):
+        """Checks that a saved transducer is restored unchanged."""
+        S = [("a", "1"), ("b", "1"), ("aa", "01"), ("ab", "01")]
+        t = ostia(S, ["a", "b"], ["0", "1"])
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "fst")
+            t.save(path)
+            loaded = FST.load(path)
+            mapped = FST.load(path, mmap=True)
+            self.assertIsInstance(mapped.E.codes, memoryview)
+            for w in ["a", "b", "aba", "abba"]:
+                self.assertEqual(mapped.rewrite(w), t.rewrite(w))
+            self.assertEqual(mapped.E, t.E)
+            self.assertEqual(mapped.copy_fst().E, t.E)
+        self.assertEqual(loaded.Q, t.Q)
+        self.assertEqual(loaded.E, t.E)
+        self.assertEqual(loaded.stout, t.stout)
+        self.assertEqual(loaded.rewrite("aba"), t.rewrite("aba"))
+
+    def test_ostia_segments(self):
+        """Checks learning a mapping over multi-character segments."""
+        S = [(("sh", "a"), ("SH", "a")), (("s", "a"), ("S", "a")), (("a",), ("a",))]
+        t = ostia(S, ["sh", "s", "a"], ["SH", "S", "a"])
+        self.assertEqual(t.rewrite(("sh", "a")), ("SH", "a"))
+        self.assertEqual(t.rewrite("sa"), ("S", "a"))
+
     def test_ostia_fail(self):
         """Checks that OTSIA cannot learn an unbounded tone plateauing."""
         S = [
@@ -70,6 +100,14 @@ class TestOSTIA(unittest.TestCase):
         self.assertTrue(set(t.E) == transitions)
         self.assertTrue(stout == t.stout)
 
+    def test_package_ostia(self):
+        """Checks that the package exports the learner, not its module,
+        after the module was imported."""
+        importlib.import_module("sigmapie.ostia")
+        sigmapie = importlib.import_module("sigmapie")
+        self.assertTrue(callable(sigmapie.ostia))
+        self.assertIn("ostia", sigmapie.__all__)
+
 
 if __name__ == "__main__":
     unittest.main()
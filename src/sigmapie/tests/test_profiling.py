@@ -0,0 +1,96 @@
+#!/bin/python3
+
+"""A module with the unittests for the profiling module. Copyright (C) 2019
+Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import logging
+import threading
+import unittest
+from tsl_class import *
+from ostia import ostia
+
+try:
+    from contextvars import copy_context
+except ImportError:  # Python 3.6, the phases are kept per thread
+    copy_context = None
+
+
+class TestProfile(unittest.TestCase):
+    """Tests for the instrumentation of the learners."""
+
+    def test_learners(self):
+        """Checks that the phases and the counts of the learners are
+        recorded inside the profiled block only."""
+        data = ["aaa", "bbb", "aab", "abb", "acab", "abbc"]
+        with profile() as p:
+            tsl = TSL(data=data)
+            tsl.learn()
+        result = p.as_dict()
+        for phase in ["TSL.learn", "TSL.learn/tier/tests", "TSL.learn/ngrams"]:
+            self.assertIn(phase, result["phases"])
+        self.assertEqual(result["counts"]["TSL.learn/tier/strings"], 6)
+        self.assertEqual(result["counts"]["TSL.learn/tier/tier"], len(tsl.tier))
+        self.assertEqual(result["counts"]["TSL.learn/grammar"], len(tsl.grammar))
+
+        TSL(data=data).learn()
+        self.assertEqual(p.as_dict(), result)
+
+    def test_ostia(self):
+        """Checks the counters of OSTIA and the logging of the phases."""
+        pairs = [("a", "a"), ("ab", "ab"), ("abb", "abb"), ("b", "b")]
+        with self.assertLogs("sigmapie.test", logging.DEBUG) as logs:
+            with profile(logging.getLogger("sigmapie.test")) as p:
+                fst = ostia(pairs, ["a", "b"], ["a", "b"])
+        counts = p.as_dict()["counts"]
+        self.assertEqual(counts["ostia/states"], len(fst.Q))
+        self.assertGreaterEqual(
+            counts["ostia/merge/merges tried"], counts["ostia/merge/merges accepted"]
+        )
+        self.assertIn("ostia/merge/blue states", p.as_dict()["peaks"])
+        self.assertTrue(any("ostia/ptt" in line for line in logs.output))
+
+    def test_contexts(self):
+        """Checks that the profiles and the open phases of concurrent
+        threads and of other contexts are kept apart."""
+        data = {"a": ["aaa", "aab"], "b": ["bbb", "abb", "bab", "bba"]}
+        barrier = threading.Barrier(2)
+        results = {}
+
+        def learn(name):
+            with profile() as p:
+                barrier.wait()
+                TSL(data=data[name]).learn()
+                barrier.wait()
+            results[name] = p.as_dict()["counts"]
+
+        threads = [threading.Thread(target=learn, args=(i,)) for i in data]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results["a"]["TSL.learn/tier/strings"], 2)
+        self.assertEqual(results["b"]["TSL.learn/tier/strings"], 4)
+
+        with profile() as p:
+            with p.phase("outer"):
+                if copy_context is not None:
+                    copy_context().run(p.count, "inner")
+                else:
+                    p.count("inner")
+                other = threading.Thread(target=p.count, args=("thread",))
+                other.start()
+                other.join()
+                self.assertEqual(p.stack, ["outer"])
+        self.assertEqual(p.counts, {"outer/inner": 1, "thread": 1})
+        self.assertEqual(p.stack, [])
+        self.assertIsNot(active_profile(), p)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/bin/python3
+
+"""A module with the unittests for the progress module. Copyright (C) 2019
+Alena Aksenova.
+
+This program is free software; you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation; either version 3 of the License, or (at your
+option) any later version.
+"""
+
+import threading
+import unittest
+from mtsl_class import *
+from sp_class import *
+from ostia import ostia
+
+
+class TestProgress(unittest.TestCase):
+    """Tests for the progress reports and the cancellation of learners."""
+
+    def test_reports(self):
+        """Checks that the phases of the learner are reported with the
+        numbers of the processed items."""
+        reports = []
+        tsl = TSL(data=["aaa", "bbb", "aab", "abb", "acab", "abbc"])
+        tsl.learn(progress=reports.append)
+
+        phases = [r["phase"] for r in reports]
+        for phase in ["tier ngrams", "tier tests", "grammar"]:
+            self.assertIn(phase, phases)
+        last = [r for r in reports if r["phase"] == "tier tests"][-1]
+        self.assertEqual(last["done"], last["total"])
+        self.assertEqual(last["total"], len(tsl.alphabet))
+        self.assertEqual(last["eta"], 0)
+
+    def test_cancel(self):
+        """Checks that cancelled learners leave the grammar unchanged."""
+        event = threading.Event()
+        event.set()
+        tsl = TSL(data=["aaa", "bbb", "aab", "abb"])
+        with self.assertRaises(Cancelled):
+            tsl.learn(cancel=event)
+        self.assertEqual((tsl.alphabet, tsl.tier, tsl.grammar), (None, None, []))
+
+        calls = []
+        mtsl = MTSL(alphabet=["a", "b", "o"], data=["ab", "ob", "aoa", "bab"])
+        with self.assertRaises(Cancelled):
+            mtsl.learn(cancel=lambda: calls.append(1) or len(calls) > 8)
+        self.assertEqual((mtsl.tier, mtsl.grammar), (None, []))
+        mtsl.learn(cancel=lambda: False)
+        self.assertTrue(mtsl.grammar)
+
+        sp = SP(alphabet=["a", "b"], grammar=[("a", "b")])
+        fsm = sp.fsm
+        with self.assertRaises(Cancelled):
+            sp.fsmize(cancel=lambda: True)
+        self.assertIs(sp.fsm, fsm)
+        sp.fsmize()
+        self.assertEqual(len(sp.fsm.family), 2)
+
+    def test_timeout(self):
+        """Checks that the learner is stopped once it runs out of time."""
+        pairs = [("a", "a"), ("ab", "ab"), ("abb", "abb"), ("b", "b")]
+        tracker = Progress(timeout=10)
+        tracker.start -= 20
+        with self.assertRaises(Cancelled):
+            ostia(pairs, ["a", "b"], ["a", "b"], progress=tracker)
+        fst = ostia(pairs, ["a", "b"], ["a", "b"], timeout=10)
+        self.assertEqual(fst.rewrite("abb"), "abb")
+
+
+if __name__ == "__main__":
+    unittest.main()
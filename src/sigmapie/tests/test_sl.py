@@ -9,7 +9,14 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+import os
+import json
+import pickle
+import random
+import tempfile
 import unittest
+import unittest.mock
+from math import log
 from sl_class import *
 
 
@@ -42,6 +49,28 @@ class TestSLLanguages(unittest.TestCase):
         self.assertTrue(sln.scan("aaaaa"))
         self.assertTrue(sln.scan(""))
 
+    def test_scan_recompiles(self):
+        """Checks that changing the grammar after scanning or generating
+        invalidates the compiled acceptor and the FSM."""
+        sl = SL(alphabet=["a", "b"])
+        sl.grammar = [(">", "a"), ("a", "b"), ("b", "<")]
+        self.assertTrue(sl.scan("ab"))
+        self.assertEqual(sl.generate_sample(2), ["ab", "ab"])
+
+        sl.grammar = [(">", "b"), ("b", "a"), ("a", "<")]
+        self.assertFalse(sl.scan("ab"))
+        self.assertTrue(sl.scan("ba"))
+        self.assertEqual(sl.generate_sample(2), ["ba", "ba"])
+
+        sl.grammar.append(("a", "b"))
+        self.assertFalse(sl.scan("baba"))
+        acceptor = sl.compile()
+        self.assertIs(sl.acceptor, acceptor)
+        self.assertTrue(sl.scan("baba"))
+        sl.change_polarity("n")
+        self.assertIsNone(sl.acceptor)
+        self.assertFalse(sl.scan("baba"))
+
     def test_ngramize_2(self):
         """Checks if ngramize() correctly constructs bigrams."""
         sl = SL()
@@ -70,6 +99,21 @@ class TestSLLanguages(unittest.TestCase):
         }
         self.assertTrue(ngrams == goal)
 
+    def test_annotate_edges(self):
+        """Checks that strings and tuples are annotated with the edges of
+        the grammar."""
+        sl = SL(edges=["#", "%"], k=3)
+        self.assertEqual(sl.annotate_string(" ab "), "##ab%%")
+        self.assertEqual(sl.annotate_string(("a", "b")), tuple("##ab%%"))
+        sl.data = ["ab"]
+        sl.learn()
+        goal = {tuple("##a"), tuple("#ab"), tuple("ab%"), tuple("b%%")}
+        self.assertEqual(set(sl.grammar), goal)
+        self.assertTrue(sl.scan("ab"))
+
+        sl = SL(edges=["<s>", "</s>"])
+        self.assertEqual(sl.annotate_string("ab"), ("<s>", "a", "b", "</s>"))
+
     def test_learn(self):
         """Checks if positive and negative grammars are learned correctly."""
         data = ["abab", "ababab"]
@@ -84,6 +128,22 @@ class TestSLLanguages(unittest.TestCase):
         a.learn()
         self.assertTrue(set(a.grammar) == gneg)
 
+    def test_grammar_list(self):
+        """Checks that a learned grammar is a plain list of tuples, and that
+        the acceptor follows it after it was modified in place."""
+        a = SL(data=["abab", "ababab"], alphabet=["a", "b"])
+        a.learn()
+        self.assertIs(type(a.grammar), list)
+        self.assertTrue(all(type(i) is tuple for i in a.grammar))
+        ngrams = [list(i) for i in a.grammar]
+        self.assertEqual(json.loads(json.dumps(a.grammar)), ngrams)
+        self.assertTrue(a.scan("ab"))
+        a.grammar.sort()
+        a.grammar[a.grammar.index(("b", "<"))] = ("a", "<")
+        a.clear_cache()
+        self.assertFalse(a.scan("ab"))
+        self.assertTrue(a.scan("aba"))
+
     def test_fsmize_pos(self):
         """Checks if the transitions of the fsm corresponding to the positive
         grammar are constructed correctly."""
@@ -124,6 +184,197 @@ class TestSLLanguages(unittest.TestCase):
         self.assertTrue(all([sl.scan(i) for i in sample]))
         self.assertTrue(len(sample) == 10)
 
+    def test_generate_sample_vectorized(self):
+        """Checks that the vectorized generation produces well-formed
+        strings and is reproducible given the seed."""
+        sl = SL()
+        sl.alphabet = ["a", "b"]
+        sl.grammar = [(">", "a"), ("b", "a"), ("a", "b"), ("b", "<")]
+        sl.fsmize()
+
+        sample = sl.generate_sample(n=50, vectorized=True, seed=3)
+        self.assertTrue(all([sl.scan(i) for i in sample]))
+        self.assertEqual(len(sample), 50)
+        self.assertEqual(sample, sl.generate_sample(n=50, vectorized=True, seed=3))
+
+    def test_generate_sample_unique(self):
+        """Checks that the generation without repetitions returns distinct
+        well-formed strings, and all strings of a small language."""
+        sl = SL()
+        sl.alphabet = ["a", "b"]
+        sl.grammar = [(">", "a"), ("b", "a"), ("a", "b"), ("b", "<")]
+        sl.fsmize()
+        sample = sl.generate_sample(n=30, repeat=False, seed=5, max_len=60)
+        self.assertEqual(len(set(sample)), 30)
+        self.assertTrue(all([sl.scan(i) for i in sample]))
+        walks = sl.generate_sample(n=3, repeat=False, seed=5)
+        self.assertEqual(len(set(walks)), 3)
+        self.assertTrue(all([sl.scan(i) for i in walks]))
+        short = sl.generate_sample(n=3, repeat=False, max_len=6)
+        self.assertEqual(set(short), {"ab", "abab", "ababab"})
+
+        finite = SL(alphabet=["a", "b"], data=["ab", "ba"], k=3)
+        finite.learn()
+        finite.fsmize()
+        with self.assertRaises(ValueError):
+            finite.generate_sample(n=3, repeat=False, safe=False)
+
+    def test_generate_sample_global_seed(self):
+        """Checks that seeding the `random` module makes the generation
+        without a seed reproducible."""
+        sl = SL()
+        sl.alphabet = ["a", "b"]
+        sl.grammar = [(">", "a"), (">", "b"), ("a", "b"), ("b", "a"), ("b", "<")]
+        for repeat in [True, False]:
+            random.seed(11)
+            sample = sl.generate_sample(n=20, repeat=repeat)
+            random.seed(11)
+            self.assertEqual(sample, sl.generate_sample(n=20, repeat=repeat))
+
+    def test_generate_sample_workers(self):
+        """Checks that distributing the chunks among processes does not
+        change the sample generated for a given seed."""
+        sl = SL()
+        sl.alphabet = ["a", "b"]
+        sl.grammar = [(">", "a"), (">", "b"), ("a", "b"), ("b", "a"), ("b", "<")]
+        sl.fsmize()
+        serial = sl.generate_sample(n=2500, seed=7)
+        self.assertEqual(serial, sl.generate_sample(n=2500, seed=7, workers=2))
+        sl.grammar = [(i, j) for i in ">ab" for j in "ab<" if i + j != "><"]
+        unique = sl.generate_sample(
+            n=1500, repeat=False, seed=7, max_len=12, workers=2
+        )
+        self.assertEqual(len(set(unique)), 1500)
+        self.assertEqual(
+            unique, sl.generate_sample(n=1500, repeat=False, seed=7, max_len=12)
+        )
+
+    def test_generate_sample_large_bound(self):
+        """Checks that distinct strings are drawn from a language with more
+        strings up to the length bound than a C integer can count."""
+        alphabet = list("abcdefghij")
+        symbols = [">"] + alphabet + ["<"]
+        sl = SL(alphabet=alphabet)
+        sl.grammar = [(i, j) for i in symbols for j in symbols if i + j != "><"]
+        sl.grammar = [g for g in sl.grammar if sl.well_formed_ngram(g)]
+        for by_length in [False, True]:
+            sample = sl.generate_sample(
+                5, repeat=False, max_len=25, by_length=by_length, seed=1
+            )
+            self.assertEqual(len(set(sample)), 5)
+            self.assertTrue(all(len(w) <= 25 and sl.scan(w) for w in sample))
+
+    def test_ngram_counts(self):
+        """Checks the collected ngram frequencies, the log-probabilities
+        of strings and the weighted generation."""
+        sl = SL(alphabet=["a", "b"], data=["ab", "ab", "abb"])
+        sl.learn(counts=True)
+        self.assertEqual(sl.counts[("a", "b")], 3)
+        self.assertEqual(sl.counts[("b", "b")], 1)
+        self.assertAlmostEqual(sl.log_probability("ab"), log(3 / 4))
+        self.assertEqual(sl.log_probability("ba"), float("-inf"))
+        self.assertTrue(sl.log_probability("ba", smoothing=1) > float("-inf"))
+
+        sl.fsmize()
+        sample = sl.generate_sample(n=200, seed=3, weighted=True)
+        self.assertTrue(all(sl.scan(i) for i in sample))
+        self.assertTrue(sample.count("ab") > sample.count("abb"))
+        expected = {(">", "a"): 3, ("a", "b"): 3, ("b", "<"): 3, ("b", "b"): 1}
+        self.assertEqual(dict(sl.counts), expected)
+
+        counts = sl.counts
+        sl.grammar = [(">", "b"), ("b", "a"), ("a", "<"), ("b", "<")]
+        sl.counts = counts
+        sample = sl.generate_sample(n=20, seed=3, weighted=True)
+        self.assertTrue(all(sl.scan(i) for i in sample))
+
+    def test_save_load(self):
+        """Checks that a saved grammar is restored with its frequencies,
+        and that the data is only saved on request."""
+        sl = SL(alphabet=["a", "b"], data=["ab", "abb"])
+        sl.learn(counts=True)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "grammar")
+            sl.save(path)
+            loaded = SL.load(path)
+            self.assertEqual(loaded.data, [])
+            sl.save(path, data=True)
+            self.assertEqual(SL.load(path).data, ["ab", "abb"])
+        self.assertEqual(loaded.grammar, sl.grammar)
+        self.assertEqual(loaded.counts, sl.counts)
+        self.assertTrue(loaded.scan("abbb"))
+        self.assertFalse(loaded.scan("ba"))
+
+    def test_load_mmap(self):
+        """Checks that a grammar loaded from a memory map scans strings with
+        the mapped packed ngrams, and keeps its ngrams as a list."""
+        sl = SL(alphabet=["a", "b", "c"], data=["ab", "acb", "cc", "accbb"])
+        sl.learn()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "grammar")
+            sl.save(path)
+            loaded = SL.load(path, mmap=True)
+            self.assertIsInstance(loaded.packed_grammar().values, memoryview)
+            self.assertIsInstance(loaded.grammar, list)
+            unpack = unittest.mock.patch.object(
+                SymbolTable, "unpack", side_effect=AssertionError
+            )
+            with unpack:
+                for w in ["ab", "ba", "acca", "bcb", "accbb"]:
+                    self.assertEqual(loaded.scan(w), sl.scan(w))
+            self.assertEqual(loaded.grammar, sl.grammar)
+            copied = pickle.loads(pickle.dumps(loaded))
+            self.assertEqual(copied.grammar, sl.grammar)
+
+    def test_segments(self):
+        """Checks learning, scanning and generation over tuples of
+        multi-character segments."""
+        data = [("sh", "a", "ts"), ("ts", "a", "sh", "a"), ("a", "sh", "a")]
+        sl = SL(data=data)
+        sl.learn()
+        self.assertEqual(sl.alphabet, ["a", "sh", "ts"])
+        sl.fsmize()
+        self.assertTrue(sl.scan(("sh", "a", "sh", "a")))
+        self.assertFalse(sl.scan(("sh", "sh")))
+        sample = sl.generate_sample(n=20, seed=2)
+        self.assertTrue(all(isinstance(i, tuple) and sl.scan(i) for i in sample))
+
+        tok = Tokenizer(["a", "sh", "ts"])
+        ids = SL(data=[tok.tokenize("shats"), tok.tokenize("tsasha")])
+        ids.learn()
+        self.assertEqual(ids.alphabet, [0, 1, 2])
+        self.assertTrue(ids.scan(tok.tokenize("shasha")))
+        self.assertFalse(ids.scan(tok.tokenize("shsh")))
+        sample = ids.generate_sample(n=20, seed=2)
+        self.assertTrue(all(ids.scan(array("I", i)) for i in sample))
+
+    def test_enumerate(self):
+        """Checks that the strings are listed in shortlex order and
+        counted correctly."""
+        sl = SL()
+        sl.alphabet = ["a", "b"]
+        sl.grammar = [(">", "a"), (">", "b"), ("a", "b"), ("b", "a"), ("b", "<")]
+        self.assertEqual(list(sl.enumerate(4)), ["b", "ab", "bab", "abab"])
+        self.assertEqual(sl.count(4), 4)
+        self.assertEqual(sl.count(9), 9)
+
+    def test_state_map(self):
+        """Checks that the state map lists the possible next symbols of
+        every state, optionally together with their weights."""
+        sl = SL()
+        sl.alphabet = ["a", "b"]
+        sl.grammar = [(">", "a"), (">", "b"), ("a", "b"), ("b", "a"), ("b", "<")]
+        sl.fsmize()
+        smap = {i: set(j) for i, j in sl.state_map().items()}
+        expected = {">": {"a", "b"}, "a": {"b"}, "b": {"a", "<"}}
+        self.assertEqual(smap, expected)
+        word = sl.generate_item(sl.state_map(), random.Random(1))
+        self.assertTrue(sl.scan(word))
+
+        weighted = sl.state_map(weights={(">", "a"): 3, ("b", "<"): 1})
+        symbols, weights = weighted[">"]
+        self.assertEqual(dict(zip(symbols, weights)), {"a": 3, "b": 0})
+
     def test_switch_polarity(self):
         """Makes sure that switch_polarity actually switches the grammar to the
         opposite, and that switching it again will result in the original
@@ -9,7 +9,9 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+import random
 import unittest
+from itertools import product
 from sp_class import *
 
 
@@ -136,6 +138,44 @@ class TestSPLanguages(unittest.TestCase):
         self.assertFalse(sp.scan("abababba"))
         self.assertFalse(sp.scan("abbbbabbaababab"))
 
+    def test_scan_pos(self):
+        """Tests if a positive grammar is read as the list of allowed
+        subsequences."""
+        sp = SP(polar="p")
+        sp.grammar = [tuple(i) for i in ["ab", "ba", "bb"]]
+        sp.extract_alphabet()
+
+        self.assertTrue(sp.scan("bbabb"))
+        self.assertTrue(sp.scan("a"))
+        self.assertFalse(sp.scan("aba"))
+        self.assertFalse(sp.scan("baab"))
+
+    def test_scan_subsequences(self):
+        """Checks the automaton against the subsequences of the strings,
+        including strings with symbols outside of the alphabet."""
+        rng = random.Random(7)
+        for k, polar in product([2, 3], ["p", "n"]):
+            sp = SP(alphabet=["a", "b", "c"], k=k, polar=polar)
+            sp.grammar = rng.sample(list(product("abc", repeat=k)), 2 * k)
+            listed = set(sp.grammar)
+            words = ["e", "ec", "ce", "ecd", "ace"]
+            for i in range(200):
+                words.append("".join(rng.choices("abcde", k=rng.randrange(6))))
+            for w in words:
+                found = [i in listed for i in sp.subsequences(w)]
+                expected = all(found) if polar == "p" else not any(found)
+                self.assertEqual(sp.scan(w), expected, (k, polar, w))
+
+    def test_generate_item_pos(self):
+        """Tests string generation given a positive grammar."""
+        sp = SP(polar="p")
+        sp.grammar = [tuple(i) for i in ["ab", "ba", "bb"]]
+        sp.extract_alphabet()
+
+        acceptor = sp.compile_acceptor()
+        for i in range(30):
+            self.assertTrue(sp.scan(sp.generate_item(acceptor)))
+
     def test_generate_item(self):
         """Tests string generation."""
         sp = SP(polar="n")
@@ -157,6 +197,9 @@ class TestSPLanguages(unittest.TestCase):
         a = sp.generate_sample(n=10)
         self.assertTrue(len(a) == 10)
 
+        b = sp.generate_sample(n=30, repeat=True, seed=2)
+        self.assertEqual(b, sp.generate_sample(n=30, repeat=True, seed=2))
+
     def test_generate_sample_neg(self):
         """Tests sample generation when the grammar is negative."""
         sp = SP(polar="n")
@@ -168,6 +211,51 @@ class TestSPLanguages(unittest.TestCase):
         a = sp.generate_sample(n=15, repeat=False)
         self.assertTrue(len(set(a)) == 15)
 
+    def test_generate_sample_large_automaton(self):
+        """Checks the generation without repetitions up to a length bound
+        when too many states are reachable within the bound to draw the
+        strings exactly."""
+        sp = SP(polar="n", k=3)
+        sp.alphabet = [chr(ord("a") + i) for i in range(16)]
+        sp.grammar = [
+            g for g in product(sp.alphabet, repeat=3) if sum(map(ord, g)) % 20 == 0
+        ]
+        self.assertFalse(sp.paths(6).explore(EXACT_SAMPLING_STATES))
+        sample = sp.generate_sample(n=20, max_len=6, seed=2)
+        self.assertEqual(len(set(sample)), 20)
+        self.assertTrue(all(len(w) <= 6 and sp.scan(w) for w in sample))
+
+    def test_generate_sample_global_seed(self):
+        """Checks that seeding the `random` module makes the generation
+        without a seed reproducible."""
+        sp = SP(alphabet=["a", "b", "c"], grammar=[tuple("ab")], polar="n")
+        random.seed(3)
+        sample = sp.generate_sample(n=10)
+        random.seed(3)
+        self.assertEqual(sample, sp.generate_sample(n=10))
+
+    def test_enumerate(self):
+        """Checks that all and only well-formed strings are listed."""
+        sp = SP(polar="n")
+        sp.grammar = [tuple("ab")]
+        sp.alphabet = ["a", "b"]
+        expected = ["", "a", "b", "aa", "ba", "bb", "aaa", "baa", "bba", "bbb"]
+        self.assertEqual(list(sp.enumerate(3)), expected)
+        self.assertEqual(sp.count(10), 66)
+
+    def test_count_large_alphabet(self):
+        """Checks that the strings of a grammar with a large alphabet are
+        counted over the states reached within the length bound."""
+        sp = SP(polar="n")
+        sp.alphabet = [chr(ord("a") + i) for i in range(20)]
+        sp.grammar = [(i, j) for i in sp.alphabet[::2] for j in sp.alphabet[1::2]]
+        words = [""] + list(sp.alphabet)
+        words += [i + j for i in sp.alphabet for j in sp.alphabet]
+        words += [w + j for w in words[21:] for j in sp.alphabet]
+        expected = [w for w in words if sp.scan(w)]
+        self.assertEqual(sp.count(3), len(expected))
+        self.assertEqual(set(sp.enumerate(3)), set(expected))
+
 
 if __name__ == "__main__":
     unittest.main()
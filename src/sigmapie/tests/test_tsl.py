@@ -9,7 +9,10 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
+import os
+import tempfile
 import unittest
+import unittest.mock
 from tsl_class import *
 
 
@@ -49,6 +52,19 @@ class TestTSLLanguages(unittest.TestCase):
         a.tier = ["a"]
         self.assertTrue(a.tier_image("cvamda") == "aa")
 
+    def test_learn_edges(self):
+        """Checks that the tier grammar is learned with the given edges."""
+        data = ["aaa", "bbb", "aab", "abb", "acab", "abbc"]
+        plain = TSL(data=data)
+        plain.learn()
+        tagged = TSL(data=data, edges=["<s>", "</s>"])
+        tagged.learn()
+        rename = {">": "<s>", "<": "</s>"}
+        expected = {tuple(rename.get(s, s) for s in i) for i in plain.grammar}
+        self.assertEqual(set(tagged.grammar), expected)
+        for s in ["aab", "ba", "cab"]:
+            self.assertEqual(tagged.scan(s), plain.scan(s))
+
     def test_learn_pos(self):
         """Tests learning of the positive TSL grammar."""
         a = TSL()
@@ -161,6 +177,28 @@ class TestTSLLanguages(unittest.TestCase):
         self.assertFalse(a.scan("okakok"))
         self.assertFalse(a.scan("kakokak"))
 
+    def test_scan_recompiles(self):
+        """Checks that changing the tier invalidates the compiled
+        acceptor."""
+        t = TSL(alphabet=["a", "b", "c"], polar="n", tier=["a", "b"])
+        t.grammar = [("a", "b")]
+        self.assertFalse(t.scan("acb"))
+        t.tier = ["a", "b", "c"]
+        self.assertTrue(t.scan("acb"))
+        self.assertFalse(t.scan("abc"))
+
+    def test_get_fsm_cached(self):
+        """Checks that the FSM is only rebuilt after the grammar changed."""
+        t = TSL(alphabet=["a", "b", "c"], polar="n", tier=["a", "b"])
+        t.grammar = [("a", "b")]
+        with unittest.mock.patch.object(TSL, "fsmize", wraps=t.fsmize) as fsmize:
+            for i in range(3):
+                t.get_fsm()
+            self.assertEqual(fsmize.call_count, 1)
+            t.tier = ["a", "b", "c"]
+            t.get_fsm()
+            self.assertEqual(fsmize.call_count, 2)
+
     def test_generate_item_pos(self):
         """Tests that the generated items are grammatical."""
         a = TSL(polar="p")
@@ -280,6 +318,46 @@ class TestTSLLanguages(unittest.TestCase):
         for i in sample:
             self.assertTrue(a.scan(i))
 
+        sample = a.generate_sample(n=100, repeat=False, by_length=True)
+        self.assertEqual(len(set(sample)), 100)
+        for i in sample:
+            self.assertTrue(a.scan(i))
+
+    def test_generate_sample_insertion(self):
+        """Checks that the generation is reproducible given the seed, and
+        that the number of inserted non-tier symbols can be controlled."""
+        a = TSL(polar="p")
+        a.grammar = [(">", "a"), ("a", "b"), ("b", "<"), ("b", "a")]
+        a.tier = ["a", "b"]
+        a.alphabet = ["a", "b", "c"]
+
+        sample = a.generate_sample(n=50, seed=7)
+        self.assertEqual(sample, a.generate_sample(n=50, seed=7))
+        self.assertTrue(all(a.scan(i) for i in sample))
+
+        bare = a.generate_sample(n=20, insertion=[1])
+        self.assertTrue(all("c" not in i for i in bare))
+        padded = a.generate_sample(n=20, insertion=[0, 1])
+        self.assertTrue(all(i.startswith("c") and i.endswith("c") for i in padded))
+
+    def test_load_mmap(self):
+        """Checks that a grammar loaded from a memory map scans strings
+        like the original one, and falls back to the usual structures
+        once the grammar is changed."""
+        t = TSL(alphabet=["a", "b", "c"], data=["ab", "acb", "cc", "accbb"])
+        t.change_polarity("n")
+        t.learn()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "grammar")
+            t.save(path)
+            loaded = TSL.load(path, mmap=True)
+            self.assertEqual(loaded.grammar, t.grammar)
+            self.assertEqual(loaded.tier, t.tier)
+            for w in ["ab", "ba", "acca", "bcb"]:
+                self.assertEqual(loaded.scan(w), t.scan(w))
+            loaded.grammar = []
+            self.assertTrue(loaded.scan("ba"))
+
 
 if __name__ == "__main__":
     unittest.main()
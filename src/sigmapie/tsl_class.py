@@ -7,7 +7,7 @@ Free Software Foundation; either version 3 of the License, or (at your
 option) any later version.
 """
 
-from random import choice, randint
+from random import Random
 from sigmapie.sl_class import *
 
 
@@ -40,38 +40,99 @@ class TSL(SL):
         self.tier = tier
         self.fsm = FSM(initial=self.edges[0], final=self.edges[1])
 
-    def learn(self):
+    def learn(self, progress=None, timeout=None, cancel=None):
         """Learns tier and finds attested (if positive) or unattested (if
-        negative) ngrams of the tier images of the data."""
-        if not self.alphabet:
-            raise ValueError("Alphabet cannot be empty.")
+        negative) ngrams of the tier images of the data.
+
+        Arguments:
+            progress (callable): receives reports on the processed
+                strings and symbols, see `Progress`;
+            timeout (float): the time budget in seconds;
+            cancel (callable or Event): stops the learner when it
+                returns True or is set.
+        Raises:
+            Cancelled: if the learner was cancelled or ran out of time;
+                the grammar, the tier and the alphabet are left as
+                they were.
+        """
         if not self.data:
             raise ValueError("Data needs to be provided.")
 
-        self.learn_tier()
-        tier_sequences = [self.tier_image(i) for i in self.data]
-        self.grammar = TSL(k=self.k, data=tier_sequences).ngramize_data()
-
-        if self.check_polarity() == "n":
-            self.grammar = self.opposite_polarity(self.tier)
-
-    def learn_tier(self):
+        tracker = make_progress(progress, timeout, cancel)
+        previous = (self.alphabet, self.tier)
+        prof = active_profile()
+        with prof.phase("TSL.learn"):
+            try:
+                with prof.phase("tier"):
+                    self.learn_tier(tracker)
+                with prof.phase("ngrams"):
+                    tracker.phase("grammar", sized(self.data))
+                    images = (self.tier_image(i) for i in tracked(self.data, tracker))
+                    tiers = TSL(k=self.k, data=images, edges=self.edges)
+                    grammar = tiers.ngramize_data()
+            except Cancelled:
+                self.alphabet, self.tier = previous
+                raise
+
+            self.grammar = grammar
+            if self.check_polarity() == "n":
+                with prof.phase("polarity"):
+                    self.grammar = self.opposite_polarity(self.tier)
+            prof.count("grammar", len(self.grammar))
+        tracker.finish()
+
+    def learn_tier(self, progress=None, timeout=None, cancel=None):
         """This function determines which of the symbols used in the language
         are tier symbols, algorithm by Jardine & McMullin (2017).
 
+        The k-grams, (k-1)-grams and (k+1)-grams of the data are
+        collected in a single pass over it; if the alphabet is not
+        provided, it is collected in the same pass.
         Updates tier attribute.
+        Arguments:
+            progress (callable): receives reports on the processed
+                strings and symbols, see `Progress`;
+            timeout (float): the time budget in seconds;
+            cancel (callable or Event): stops the learner when it
+                returns True or is set.
+        Raises:
+            Cancelled: if the learner was cancelled or ran out of time;
+                the tier and the alphabet are left as they were.
         """
-        self.tier = self.alphabet[:]
-        ngrams = self.ngramize_data()
+        tracker = make_progress(progress, timeout, cancel)
+        prof = active_profile()
+        sizes = [self.k, self.k - 1, self.k + 1]
+        found = [set() for k in sizes]
+        symbols, strings = set(), 0
+        with prof.phase("ngrams"):
+            tracker.phase("tier ngrams", sized(self.data))
+            for s in tracked(self.data, tracker):
+                symbols.update(s)
+                for k, ngrams in zip(sizes, found):
+                    ngrams.update(self.ngramize_item(self.annotate_string(s, k), k))
+                strings += 1
+        prof.count("strings", strings)
+        for k, ngrams in zip(sizes, found):
+            prof.count(str(k) + "-grams", len(ngrams))
+
+        alphabet = self.alphabet or sorted(symbols - set(self.edges))
+        ngrams, ngrams_less, ngrams_more = [list(i) for i in found]
+        tier = alphabet[:]
+
+        with prof.phase("tests"):
+            tracker.phase("tier tests", len(alphabet))
+            for symbol in tracked(alphabet, tracker):
+                if self.test_insert(symbol, ngrams, ngrams_less) and self.test_remove(
+                    symbol, ngrams, ngrams_more
+                ):
+                    tier.remove(symbol)
+        prof.count("tier", len(tier))
 
-        ngrams_less = TSL(data=self.data, k=(self.k - 1)).ngramize_data()
-        ngrams_more = TSL(data=self.data, k=(self.k + 1)).ngramize_data()
-
-        for symbol in self.alphabet:
-            if self.test_insert(symbol, ngrams, ngrams_less) and self.test_remove(
-                symbol, ngrams, ngrams_more
-            ):
-                self.tier.remove(symbol)
+        if not self.alphabet:
+            self.alphabet = alphabet
+        self.tier = tier
+        if tracker is not progress:
+            tracker.finish()
 
     def test_insert(self, symbol, ngrams, ngrams_less):
         """Tier presense test #1.
@@ -94,8 +155,8 @@ class TSL(SL):
                     extension.append(new)
 
         # needs to be here: otherwise no local WF/WE processes
-        edgecase1 = tuple(self.edges[0] * (self.k - 1) + symbol)
-        edgecase2 = tuple(symbol + self.edges[1] * (self.k - 1))
+        edgecase1 = (self.edges[0],) * (self.k - 1) + (symbol,)
+        edgecase2 = (symbol,) + (self.edges[1],) * (self.k - 1)
         extension.extend([edgecase1, edgecase2])
 
         return set(extension).issubset(set(ngrams))
@@ -127,11 +188,13 @@ class TSL(SL):
         """Function that returns a tier image of the input string.
 
         Arguments:
-            string (str): string that needs to be processed.
+            string (str or tuple): string that needs to be processed.
         Returns:
-            str: tier image of the input string.
+            str or tuple: tier image of the input string.
         """
-        return "".join(i for i in string if i in self.tier)
+        if isinstance(string, str):
+            return "".join(i for i in string if i in self.tier)
+        return tuple(i for i in string if i in self.tier)
 
     def fsmize(self):
         """Builds FSM corresponding to the given grammar and saves in it the
@@ -149,6 +212,25 @@ class TSL(SL):
         else:
             opposite = self.opposite_polarity(self.tier)
             self.fsm.sl_to_fsm(opposite)
+        self._cache["fsm"] = self.fsm
+
+    def dump(self, data=False):
+        """Describes the grammar and its tier by a header and typed arrays,
+        see `L.save`.
+
+        Arguments:
+            data (bool): also includes the training data.
+        Returns:
+            tuple: a JSON-serializable header and the arrays.
+        """
+        header, sections = super().dump(data)
+        header["tier"] = self.tier
+        return header, sections
+
+    def restore(self, header, sections):
+        """Restores the grammar from its description, see `dump`."""
+        super().restore(header, sections)
+        self.tier = header["tier"]
 
     def switch_polarity(self):
         """Changes polarity of the grammar, and rewrites grammar to the
@@ -162,17 +244,41 @@ class TSL(SL):
         self.grammar = self.opposite_polarity(self.tier)
         self.change_polarity()
 
-    def generate_sample(self, n=10, repeat=True, safe=True):
+    def generate_sample(
+        self,
+        n=10,
+        repeat=True,
+        safe=True,
+        seed=None,
+        max_len=None,
+        by_length=False,
+        insertion=None,
+        workers=1,
+    ):
         """Generates n well-formed strings, with or without repetitions.
 
         Arguments:
             n (int): the number of examples to be generated;
             repeat (bool): allow (rep=True) or prohibit (rep=False)
                repetitions of the same data items;
-            safe (bool): automatically break out of infinite loops,
-                for example, when the grammar cannot generate the
-                required number of data items, and the repetitions
-                are set to False.
+            safe (bool): if the grammar cannot generate the required
+                number of data items and the repetitions are set to
+                False, return all the strings it can generate instead
+                of raising a ValueError;
+            seed (int): seed of the random generator; the sample is
+                generated in chunks with streams derived from it, see
+                `seeded_chunks`;
+            max_len (int): without repetitions, draws the strings
+                uniformly among the strings up to this length, see
+                `generate_unique`; if not given, random strings are
+                generated until n distinct ones are found, as with
+                repetitions, see `sample_distinct`;
+            by_length (bool): with max_len, choose the length of every
+                string uniformly, see `generate_unique`;
+            insertion (list): weights of inserting 0, 1, 2, ... non-tier
+                symbols around every tier symbol, see `insertion_weights`;
+            workers (int): number of processes among which the chunks
+                of the sample are distributed, see `map_chunks`.
         Returns:
             list: generated data sample.
         """
@@ -191,101 +297,156 @@ class TSL(SL):
             sl.k = self.k
             sl.edges = self.edges
             sl.fsmize()
-            return sl.generate_sample(n, repeat, safe)
-
-        if not self.fsm.transitions:
-            self.fsmize()
+            return sl.generate_sample(
+                n,
+                repeat,
+                safe,
+                seed=seed,
+                max_len=max_len,
+                by_length=by_length,
+                workers=workers,
+            )
 
-        statemap = self.state_map()
-        data = [self.generate_item() for i in range(n)]
+        self.get_fsm()
 
         if not repeat:
-            data = set(data)
-            useless_loops = 0
-            prev_len = len(data)
-            while len(data) < n:
-                data.add(self.generate_item())
-                if prev_len == len(data):
-                    useless_loops += 1
-                else:
-                    useless_loops = 0
-
-                if safe and useless_loops > 100:
-                    print(
-                        "The grammar cannot produce the requested number" " of strings."
-                    )
-                    break
-
-        return list(data)
-
-    def generate_item(self):
-        """Generates a well-formed sequence of symbols.
+            rng = make_rng(seed)
+            if max_len is None:
+                draw = lambda: self.generate_item(insertion, rng)
+                return self.sample_distinct(n, draw, safe)
+            return self.generate_unique(
+                n, self.paths(max_len), by_length, safe, rng, workers
+            )
+
+        shared = (self.tier_table(), insertion)
+        chunks = self.seeded_chunks(n, seed)
+        return self.map_chunks("generate_chunk", shared, chunks, workers)
 
+    def generate_chunk(self, table, insertion, size, seed):
+        """Generates a chunk of the sample with its own random stream.
+
+        Arguments:
+            table (list): the encoded tier states, see `tier_table`;
+            insertion (list): weights of inserting non-tier symbols,
+                see `insertion_weights`;
+            size (int): the number of strings to be generated;
+            seed (int): the seed of the chunk, see `seeded_chunks`.
         Returns:
-            str: a well-formed string.
+            list: generated strings.
         """
-        if not self.fsm.transitions:
-            self.fsmize()
-
-        statemap = self.state_map()
-        if not any([len(statemap[x]) for x in statemap]):
-            raise (
-                ValueError(
-                    "There are ngrams in the grammar that are"
-                    " not leading anywhere. Clean the grammar "
-                    " or run `grammar.clean_grammar()`."
-                )
-            )
+        return self.generate_batch(size, table, Random(seed), insertion)
 
-        tier_seq = self.annotate_string(super().generate_item(statemap))
-        ind = [x for x in range(len(tier_seq)) if tier_seq[x] not in self.edges]
-        if not ind:
-            tier_items = []
-        else:
-            tier_items = list(tier_seq[ind[0] : (ind[-1] + 1)])
+    def tier_table(self):
+        """Encodes the states of the tier FSM as integers; the result is
+        cached until the grammar changes.
 
-        free_symb = list(set(self.alphabet).difference(set(self.tier)))
+        Returns:
+            list: the encoded tier states, see `SL.state_table`.
+        """
+        if "tier_table" not in self._cache:
+            self.get_fsm()
+            self._cache["tier_table"] = SL.state_table(self, self._state_map())
+        return self._cache["tier_table"]
 
-        new_string = self.edges[0] * (self.k - 1)
+    def insertion_weights(self):
+        """Returns the default weights of inserting 0, 1, ..., k+1 non-tier
+        symbols around every tier symbol: every one of k+1 slots is filled
+        with the probability 1/2.
+
+        Returns:
+            list: binomial weights of the numbers of inserted symbols.
+        """
+        weights = [1]
         for i in range(self.k + 1):
-            if randint(0, 1) and free_symb:
-                new_string += choice(free_symb)
+            weights = [a + b for a, b in zip([0] + weights, weights + [0])]
+        return weights
+
+    def generate_batch(self, n, table, rng, insertion=None):
+        """Generates n well-formed strings: generates their tier images
+        from the encoded tier states, and inserts non-tier symbols before
+        and after every tier symbol.
+
+        Arguments:
+            n (int): the number of strings to be generated;
+            table (list): the encoded tier states, see `tier_table`;
+            rng (Random): the random generator;
+            insertion (list): weights of inserting 0, 1, 2, ... non-tier
+                symbols at every position, see `insertion_weights`.
+        Returns:
+            list: generated strings.
+        """
+        tier_seqs = super().generate_batch(n, table, rng)
+        free_symb = [i for i in self.alphabet if i not in self.tier]
+        if not free_symb:
+            return tier_seqs
 
-        if not tier_items:
-            return "".join([i for i in new_string if i not in self.edges])
+        weights = self.insertion_weights() if insertion is None else insertion
+        gaps = range(len(weights))
+
+        data = []
+        for seq in tier_seqs:
+            sizes = rng.choices(gaps, weights, k=len(seq) + 1)
+            word = rng.choices(free_symb, k=sizes[0])
+            for symbol, size in zip(seq, sizes[1:]):
+                word.append(symbol)
+                word.extend(rng.choices(free_symb, k=size))
+            data.append(self.join_symbols(word))
+
+        return data
+
+    def state_table(self, statemap):
+        """Encodes the states of a tier state map as integers, and adds
+        loops reading the non-tier symbols to every state.
+
+        Arguments:
+            statemap (dict): a dictionary of possible transitions in the
+                tier fsm, keyed by tuples, see `SL._state_map`.
+        Returns:
+            list: for every state, a list of pairs (next symbol, next
+                state); the initial state is 0, and the end of the
+                string is encoded as -1.
+        """
+        table = super().state_table(statemap)
+        free_symb = [i for i in self.alphabet if i not in self.tier]
+        for q, moves in enumerate(table):
+            moves.extend((s, q) for s in free_symb)
 
-        for item in tier_items:
-            new_string += item
-            for i in range(self.k + 1):
-                if randint(0, 1) and free_symb:
-                    new_string += choice(free_symb)
+        return table
 
-        return "".join([i for i in new_string if i not in self.edges])
+    def generate_item(self, insertion=None, rng=None):
+        """Generates a well-formed sequence of symbols.
 
-    def state_map(self):
+        Arguments:
+            insertion (list): weights of inserting 0, 1, 2, ... non-tier
+                symbols around every tier symbol, see `insertion_weights`;
+            rng (Random): the random generator, see `make_rng`.
+        Returns:
+            str: a well-formed string.
         """
-        Generates a dictionary of possible transitions in the FSM.
+        rng = make_rng(rng=rng)
+        return self.generate_batch(1, self.tier_table(), rng, insertion)[0]
+
+    def compile_acceptor(self):
+        """Compiles the grammar into an acceptor over integer-packed ngrams
+        that skips the symbols which are not on the tier.
+
         Returns:
-            dict: the dictionary of the form
-                {"keys":[list of possible next symbols]}, where 
-                keys are (k-1)-long strings.
+            SLAcceptor: the compiled acceptor.
         """
-        if self.fsm is None:
-            self.fsmize()
-
-        local_alphabet = self.tier[:] + self.edges[:]
-        poss = product(local_alphabet, repeat=(self.k - 1))
-
-        smap = {}
-        for i in poss:
-            for j in self.fsm.transitions:
-                if j[0] == i:
-                    before = "".join(i)
-                    if before in smap:
-                        smap[before] += j[1]
-                    else:
-                        smap[before] = [j[1]]
-        return smap
+        if not self.tier:
+            raise ValueError(
+                "The tier is not extracted or empty. "
+                "Switch to SL or use `grammar.learn()`."
+            )
+
+        return SLAcceptor(
+            self.symbol_table(),
+            self.packed_grammar(),
+            self.k,
+            self.edges,
+            self.check_polarity(),
+            tier=self.tier,
+        )
 
     def scan(self, string):
         """Checks if the given string is well-formed with respect to the given
@@ -296,10 +457,4 @@ class TSL(SL):
         Returns:
             bool: well-formedness value of a string.
         """
-        tier_img = self.annotate_string(self.tier_image(string))
-        matches = [(n in self.grammar) for n in self.ngramize_item(tier_img)]
-
-        if self.check_polarity() == "p":
-            return all(matches)
-        else:
-            return not any(matches)
+        return self.get_acceptor().scan(string)
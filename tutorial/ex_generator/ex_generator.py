@@ -1,13 +1,15 @@
-from random import choice
+from random import Random
 
-def generate(n, specifications):
+def generate(n, specifications, rng=None):
     """ Generates an n-long word based on the specified categories. """
-    specified = list(map(choice, specifications.keys()))
-    return "".join([choice(specified) for i in range(n)])
+    rng = Random() if rng is None else rng
+    specified = [rng.choice(i) for i in specifications.keys()]
+    return "".join([rng.choice(specified) for i in range(n)])
 
-def generate_words(m, n, specifications):
+def generate_words(m, n, specifications, seed=None):
     """ Generates m n-long words based on the specified categories. """
-    return [generate(n, specifications) for i in range(m)]
+    rng = Random(seed)
+    return [generate(n, specifications, rng) for i in range(m)]
 
 def mask(w, specifications):
     """ Masks all non-initial mentions of the specified allophone. """
@@ -26,8 +28,8 @@ def mask_words(words, specifications):
     """ Masks every word of a given list. """
     return [mask(w, specifications) for w in words]
 
-def generate_pairs(m, n, specifications):
+def generate_pairs(m, n, specifications, seed=None):
     """ Generates m pairs of n-long words. """
-    outputs = generate_words(m, n, specifications)
+    outputs = generate_words(m, n, specifications, seed)
     inputs = mask_words(outputs, specifications)
     return list(zip(inputs, outputs))